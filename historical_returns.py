@@ -0,0 +1,140 @@
+"""
+Historical monthly returns as a Monte Carlo return source.
+
+Instead of lognormal returns, return paths are resampled from a history of monthly index
+returns with the stationary block bootstrap (Politis & Romano, 1994): a path copies
+consecutive historical months starting at a random month, and every month a new block
+starts at another random month with probability 1 / block_length. Blocks keep the short-
+range dependence of the history (momentum, volatility clustering) that independent
+draws would destroy.
+
+- HistoricalReturns(...) -> loads a CSV of monthly returns once, caches the column as a
+  .npy file next to it and memory-maps that; sample(...) builds return matrices month by
+  month from the mapped history, keeping only one row index per path. Instances are picklable (workers reopen the map).
+  rolling_windows(...) gives every historical start month as a column of a zero-copy
+  (months, n_windows) view, for backtests.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Iterator, Optional, Tuple
+
+
+class HistoricalReturns:
+    """
+    Stationary block-bootstrap source of (months, n_paths) gross monthly return matrices.
+
+    `csv_path` is a CSV file with a header row; `column` holds monthly simple returns
+    (0.012 for +1.2%), one row per month in chronological order. The column is converted
+    to gross returns and saved as `<csv stem>.<column>.npy` next to the CSV the first time
+    (and again whenever the CSV is newer than the cache); afterwards only the .npy file is
+    opened, with mmap_mode="r", so worker processes share the pages of one read-only
+    mapping instead of each loading the history.
+
+    `block_length` is the mean block length in months. `start_window` = (first, stop)
+    restricts the months at which blocks may start to rows [first, stop) of the history
+    (e.g. to exclude or focus on an era); blocks continue past `stop` and wrap around the
+    end of the history, as in the circular bootstrap.
+    """
+
+    def __init__(
+        self,
+        csv_path: str,
+        column: str = "return",
+        block_length: float = 12.0,
+        start_window: Optional[Tuple[int, int]] = None,
+    ):
+        if block_length < 1:
+            raise ValueError("block_length must be at least one month")
+        self.csv_path = csv_path
+        self.column = column
+        self.block_length = float(block_length)
+        self.cache_path = os.path.splitext(csv_path)[0] + f".{column}.npy"
+        self._open()
+
+        n_months = len(self.gross_returns)
+        first, stop = start_window if start_window is not None else (0, n_months)
+        if not 0 <= first < stop <= n_months:
+            raise ValueError(f"start_window must satisfy 0 <= first < stop <= {n_months}, got {start_window}")
+        self.start_window = (int(first), int(stop))
+
+    def _open(self) -> None:
+        if not os.path.exists(self.cache_path) or os.path.getmtime(self.cache_path) < os.path.getmtime(self.csv_path):
+            simple_returns = pd.read_csv(self.csv_path, usecols=[self.column])[self.column].dropna()
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, 1.0 + simple_returns.to_numpy(dtype=np.float64))
+            os.replace(tmp_path, self.cache_path)
+        self.gross_returns = np.load(self.cache_path, mmap_mode="r")
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["gross_returns"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.gross_returns = np.load(self.cache_path, mmap_mode="r")
+
+    def cache_token(self) -> dict:
+        """Identity of the history and bootstrap settings, for result-cache keys."""
+        stat = os.stat(self.cache_path)
+        return {
+            "history": os.path.abspath(self.cache_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "block_length": self.block_length,
+            "start_window": list(self.start_window),
+        }
+
+    @property
+    def mean_annual_return(self) -> float:
+        """Annualized mean gross return of the history, comparable to `mu`."""
+        return float(np.mean(self.gross_returns)) ** 12 - 1
+
+    def iter_sample_rows(self, rng: np.random.Generator, months: int, n_paths: int) -> Iterator[np.ndarray]:
+        """
+        Yield the (n_paths,) history row of every path for month 0, 1, ... months - 1 under
+        the stationary bootstrap.
+
+        Only the current rows are kept: every month each path starts a new block at a
+        random row in start_window with probability 1 / block_length (always in month 0)
+        and otherwise moves on to the next row, wrapping around the end of the history.
+        The yielded array is updated in place for the next month.
+        """
+        n_history = len(self.gross_returns)
+        first, stop = self.start_window
+        rows = rng.integers(first, stop, size=n_paths)
+        for k in range(months):
+            if k > 0:
+                rows += 1
+                rows[rows == n_history] = 0
+                new_block = rng.random(n_paths) < 1.0 / self.block_length
+                rows[new_block] = rng.integers(first, stop, size=int(np.count_nonzero(new_block)))
+            yield rows
+
+    def sample(self, rng: np.random.Generator, months: int, n_paths: int, dtype: str = "float64") -> np.ndarray:
+        """
+        (months, n_paths) gross monthly returns of type `dtype` gathered from the mapped
+        history one month at a time, so the only (months, n_paths) array is the result.
+        """
+        history = np.asarray(self.gross_returns)
+        returns = np.empty((months, n_paths), dtype=dtype)
+        for k, rows in enumerate(self.iter_sample_rows(rng, months, n_paths)):
+            returns[k] = history[rows]
+        return returns
+
+    def rolling_windows(self, months: int) -> np.ndarray:
+        """
+        (months, n_windows) matrix whose column j is the history from row j on, for every
+        start row with `months` rows of history after it (n_windows = len - months + 1).
+
+        A sliding_window_view of the memory-mapped history, transposed: no data is copied,
+        so the matrix can be fed straight into the path simulator.
+        """
+        n_history = len(self.gross_returns)
+        if months > n_history:
+            raise ValueError(f"History has {n_history} months, shorter than the {months}-month horizon")
+        return sliding_window_view(np.asarray(self.gross_returns), months).T
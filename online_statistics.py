@@ -0,0 +1,194 @@
+"""
+Online (streaming) statistics used by the Monte Carlo engine.
+
+Every accumulator can be updated with a batch of values and merged with another
+accumulator of the same kind, so Monte Carlo paths can be processed chunk by chunk (or
+in different processes) and folded together without keeping all paths in memory.
+
+- OnlineMoments -> count, mean and variance (Welford updates, Chan et al. merges).
+- QuantileSketch -> quantiles with bounded relative error (DDSketch-style log buckets).
+- OnlineCovariance -> means, variances and covariance of paired samples (used for
+  control-variate estimators).
+"""
+
+import math
+import numpy as np
+from collections import Counter
+from typing import Optional
+
+
+class OnlineMoments:
+    """
+    Mergeable count / mean / variance accumulator.
+
+    Batches are reduced to (count, mean, M2) in float64 and combined with the pairwise
+    update of Chan, Golub & LeVeque, which is the batch form of Welford's algorithm.
+    With `weights` (e.g. importance-sampling likelihood ratios) the count is the total
+    weight and mean / variance are the self-normalized weighted ones.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        if weights is None:
+            mean = float(values.mean())
+            m2 = float(np.square(values - mean).sum())
+            self._combine(values.size, mean, m2)
+            return
+        weights = np.asarray(weights, dtype=np.float64).ravel()
+        total = float(weights.sum())
+        if total == 0:
+            return
+        mean = float(weights @ values) / total
+        m2 = float(weights @ np.square(values - mean))
+        self._combine(total, mean, m2)
+
+    def merge(self, other: "OnlineMoments") -> None:
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        """Population variance (ddof=0), like np.var."""
+        return self.m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch with relative accuracy `relative_accuracy`.
+
+    Values are counted in logarithmically spaced buckets (separately for positive and
+    negative values), as in DDSketch: a value x > 0 falls in bucket ceil(log_gamma(x)) with
+    gamma = (1 + a) / (1 - a), and every quantile estimate is within a relative error a of
+    a value of the stream at that rank. Memory grows with the log of the value range, not
+    with the number of values. Non-finite values are ignored. Optional `weights` count a
+    value that many times (bucket counts are then floats).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = Counter()
+        self.negative = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if weights is None:
+            weights = np.ones_like(values, dtype=np.int64)
+        weights = np.asarray(weights).ravel()
+        finite = np.isfinite(values)
+        values = values[finite]
+        weights = weights[finite]
+        self.zero_count += weights[values == 0].sum().item()
+        self.count += weights.sum().item()
+        for store, mask, sign in ((self.positive, values > 0, 1), (self.negative, values < 0, -1)):
+            if not mask.any():
+                continue
+            keys = np.ceil(np.log(sign * values[mask]) / self._log_gamma).astype(np.int64)
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, weights=weights[mask]) if weights.dtype.kind == "f" else np.bincount(inverse)
+            store.update(dict(zip(unique_keys.tolist(), counts.tolist())))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge quantile sketches with different relative accuracy")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # most negative values first: negative buckets by decreasing magnitude
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+
+
+class OnlineCovariance:
+    """
+    Mergeable accumulator of the means, variances and covariance of paired samples (x, y),
+    using the same pairwise update as OnlineMoments for the co-moment.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if x.size == 0:
+            return
+        mean_x = float(x.mean())
+        mean_y = float(y.mean())
+        dx = x - mean_x
+        dy = y - mean_y
+        self._combine(x.size, mean_x, mean_y, float(dx @ dx), float(dy @ dy), float(dx @ dy))
+
+    def merge(self, other: "OnlineCovariance") -> None:
+        if other.count:
+            self._combine(other.count, other.mean_x, other.mean_y, other.m2_x, other.m2_y, other.c_xy)
+
+    def _combine(self, count: int, mean_x: float, mean_y: float, m2_x: float, m2_y: float, c_xy: float) -> None:
+        total = self.count + count
+        dx = mean_x - self.mean_x
+        dy = mean_y - self.mean_y
+        weight = self.count * count / total
+        self.m2_x += m2_x + dx * dx * weight
+        self.m2_y += m2_y + dy * dy * weight
+        self.c_xy += c_xy + dx * dy * weight
+        self.mean_x += dx * count / total
+        self.mean_y += dy * count / total
+        self.count = total
+
+    @property
+    def variance_x(self) -> float:
+        return self.m2_x / self.count if self.count else math.nan
+
+    @property
+    def variance_y(self) -> float:
+        return self.m2_y / self.count if self.count else math.nan
+
+    @property
+    def covariance(self) -> float:
+        return self.c_xy / self.count if self.count else math.nan
@@ -0,0 +1,261 @@
+"""
+Persistent on-disk cache of simulation results.
+
+Results are content-addressed: the key is the SHA-256 of the function name, the engine
+version and the normalized call parameters (model parameters, search options, seed), so
+rerunning the same scenario from any process serves the stored result instead of
+recomputing it.
+
+- ResultCache(cache_dir, max_mb) -> directory of results. DataFrames are stored column
+  by column in compressed .npz files, other results (dicts, lists of dicts) as JSON.
+  Writes are atomic (temporary file + os.replace), reads touch the file's mtime, and the
+  least recently used files are evicted once the directory exceeds max_mb. Writers and
+  the eviction sweep take an exclusive fcntl lock on the directory where available.
+- cacheable(...) -> decorator giving a function an optional `cache` argument.
+"""
+
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; writes stay atomic, eviction is unlocked
+    fcntl = None
+
+CACHE_FORMAT_VERSION = 1
+
+
+def normalize(value):
+    """
+    JSON-compatible canonical form of a parameter value for hashing: NumPy scalars and
+    arrays become Python numbers and lists, tuples become lists, dicts are sorted by key
+    when hashed, and objects with a cache_token() method (e.g. HistoricalReturns) are
+    replaced by their token.
+    """
+    if hasattr(value, "cache_token"):
+        return normalize(value.cache_token())
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, range, np.ndarray)):
+        return [normalize(v) for v in (value.tolist() if isinstance(value, np.ndarray) else value)]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot use a {type(value).__name__} as a cache key parameter")
+
+
+def _encode(value):
+    """JSON form of a result that keeps non-string dict keys, NumPy scalars and DataFrames."""
+    if isinstance(value, pd.DataFrame):
+        return {"__frame__": {"columns": _encode(list(value.columns)), "data": _encode(value.to_dict("list"))}}
+    if isinstance(value, dict):
+        return {"__dict__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _encode(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and "__frame__" in value:
+        frame = value["__frame__"]
+        data = _decode(frame["data"])
+        return pd.DataFrame({column: data[column] for column in _decode(frame["columns"])})
+    if isinstance(value, dict) and "__dict__" in value:
+        return {_decode(k): _decode(v) for k, v in value["__dict__"]}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _frame_to_npz(df: pd.DataFrame, f) -> None:
+    """Store a DataFrame column by column; object columns (None / mixed) go into the JSON header."""
+    arrays = {}
+    meta = {"columns": _encode(list(df.columns)), "object_columns": {}, "index": None}
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            meta["object_columns"][str(i)] = _encode(values.tolist())
+        else:
+            arrays[f"c{i}"] = values
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        arrays["index"] = df.index.to_numpy()
+        meta["index"] = _encode(df.index.name)
+    arrays["meta"] = np.array(json.dumps(meta))
+    np.savez_compressed(f, **arrays)
+
+
+def _frame_from_npz(f) -> pd.DataFrame:
+    with np.load(f, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["meta"]))
+        columns = _decode(meta["columns"])
+        data = {}
+        for i, column in enumerate(columns):
+            if str(i) in meta["object_columns"]:
+                data[column] = pd.Series(_decode(meta["object_columns"][str(i)]), dtype=object)
+            else:
+                data[column] = npz[f"c{i}"]
+        index = pd.Index(npz["index"], name=_decode(meta["index"])) if "index" in npz.files else None
+    df = pd.DataFrame(data, columns=columns)
+    if index is not None:
+        df.index = index
+    return df
+
+
+class ResultCache:
+    """
+    Size-bounded, process-safe directory of cached results (see module docstring).
+
+    `max_mb` bounds the total size of the cached files; None disables eviction.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: Optional[float] = 1024.0):
+        self.cache_dir = cache_dir
+        self.max_bytes = None if max_mb is None else int(max_mb * 2**20)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, name: str, params: dict, version: str) -> str:
+        payload = json.dumps(
+            {"format": CACHE_FORMAT_VERSION, "version": version, "name": name, "params": normalize(params)},
+            sort_keys=True,
+            allow_nan=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.cache_dir, key + ".npz"), os.path.join(self.cache_dir, key + ".json")
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.cache_dir, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: str):
+        """The cached result for `key`, or None on a miss (also if it is evicted concurrently)."""
+        npz_path, json_path = self._paths(key)
+        for path in (npz_path, json_path):
+            try:
+                with open(path, "rb") as f:
+                    if path == npz_path:
+                        value = _frame_from_npz(io.BytesIO(f.read()))
+                    else:
+                        value = _decode(json.load(f))
+            except FileNotFoundError:
+                continue
+            try:
+                os.utime(path)  # mark as recently used
+            except FileNotFoundError:
+                pass
+            return value
+        return None
+
+    def put(self, key: str, value) -> None:
+        """Store `value` (a DataFrame, or JSON-serializable after _encode) atomically, then evict."""
+        npz_path, json_path = self._paths(key)
+        path = npz_path if isinstance(value, pd.DataFrame) else json_path
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            if path == npz_path:
+                _frame_to_npz(value, f)
+            else:
+                f.write(json.dumps(_encode(value), allow_nan=True).encode("utf-8"))
+        with self._lock():
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith((".npz", ".json")):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock():
+            for name in os.listdir(self.cache_dir):
+                if name.endswith((".npz", ".json")):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def cached(self, name: str, params: dict, version: str, compute: Callable[[], object]):
+        """Serve the result of `compute` for (name, params, version) from the cache, computing it on a miss."""
+        key = self.key(name, params, version)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+
+def cacheable(version: str, ignore: Tuple[str, ...] = (), volatile: Tuple[str, ...] = ()) -> Callable:
+    """
+    Decorator for functions with a `cache: Optional[ResultCache] = None` parameter.
+
+    With a cache the call is keyed on all bound arguments (extra **kwargs flattened in)
+    except `cache` and the names in `ignore` (options such as n_workers that cannot change
+    the result), under `version` (the engine version: bump it whenever results change).
+    Calls are not cached when a `seed` argument is None (fresh entropy) or an argument in
+    `volatile` (e.g. max_seconds) is set, since their results are not reproducible.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            cache = bound.arguments.get("cache")
+            if cache is None:
+                return func(*args, **kwargs)
+            bound.arguments["cache"] = None
+
+            def compute():
+                return func(*bound.args, **bound.kwargs)
+
+            params = {}
+            for name, parameter in signature.parameters.items():
+                value = bound.arguments.get(name, parameter.default)
+                if parameter.kind == inspect.Parameter.VAR_KEYWORD:
+                    params.update(bound.arguments.get(name, {}))
+                elif name != "cache" and name not in ignore:
+                    params[name] = value
+            if params.get("seed", 0) is None or any(params.get(name) is not None for name in volatile):
+                return compute()
+            return cache.cached(func.__name__, params, version, compute)
+
+        return wrapper
+
+    return decorator
@@ -8,23 +8,99 @@ final wealth, for a list of retirement ages.
 
 How the code is organized:
 - simulate_with_retirement(...) -> runs the deterministic monthly simulation and
-  returns total_enjoyment, final_wealth and bankruptcy flag.
+  returns total_enjoyment, final_wealth and bankruptcy flag. `engine="closed_form"`
+  evaluates the same model with annuity / arithmetic-series formulas instead of the loop.
+- compile_plan(...) -> a cached RetirementPlan holding one retirement age's income, growth
+  and utility-weight arrays; evaluating a spending is then a couple of dot products
+  (`engine="plan"`). Enjoyment separates into u_pre(s) * weight_pre + u_post(s) * L *
+  weight_post, so utility_exponent_sweep(...) evaluates any utility exponents in O(1).
+- simulate_with_retirement_vectorized(...) -> the same monthly loop stepping NumPy arrays
+  of scenarios (any parameter may be an array; they are broadcast together).
+- retire_month_table(...) -> one pass over the horizon giving final wealth (as an affine
+  function of spending) and enjoyment weights for every possible retirement month.
 - max_feasible_spending_for_retire_age(...) -> constructs a discretized spending
-  grid and uses bisect to find the highest grid point with final_wealth >= 0.
+  grid and uses bisect to find the highest grid point with final_wealth >= 0
+  (`method="exact"` solves for it directly, see solve_max_feasible_spending).
+- run_grid_ages(...) / run_scenarios(...) -> the search over a list of retirement ages,
+  for one parameter set or many; per-age searches can be spread over a process pool
+  (see parallel_map) and results can be cached on disk (see result_cache.py).
 - main block runs the search for retirement ages as defined in config.json and prints a table.
 
 You can import the functions into an IDE and extend them (e.g., Monte Carlo, taxes,
 utility changes) as discussed in the project's TODO file.
 """
 
+import os
 import math
 import bisect
 import numpy as np
 import pandas as pd
 import json
-from typing import Optional, Tuple, Dict
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Callable, Optional, Tuple, Dict, Union
+
+from result_cache import ResultCache, cacheable
 
 MONTHS_PER_YEAR = 12
+# part of every result-cache key; bump whenever a change alters simulation results
+ENGINE_VERSION = "5"
+SIMULATION_ENGINES = ("loop", "closed_form", "plan")
+SEARCH_METHODS = ("bisect", "exact", "vectorized", "single_pass", "staircase", "kary", "root")
+# candidate probes per round of the k-ary search: k = 2**j - 1 splits a bracket evenly
+KARY_BRANCHINGS = tuple(2**j - 1 for j in range(1, 11))
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@lru_cache(maxsize=None)
+def age_schedule(initial_age: float, months: int) -> Tuple[float, ...]:
+    """
+    Ages at the start of each simulated month, accumulated the same way as the monthly
+    loop in simulate_with_retirement (repeated `+= 1/12`), so other engines agree with
+    the loop on which month the retirement switch happens.
+    """
+    ages = []
+    age = initial_age
+    for _ in range(months):
+        ages.append(age)
+        age += 1.0 / MONTHS_PER_YEAR
+    ages.append(age)
+    return tuple(ages)
+
+
+def retire_month_index(initial_age: float, final_age: float, retire_age: float) -> int:
+    """
+    Index of the first simulated month spent in retirement (== number of working months).
+    Returns the number of simulated months if retirement never happens within the horizon.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    ages = age_schedule(initial_age, months)
+    return min(bisect.bisect_left(ages, retire_age), months)
+
+
+def _geometric_sum(ratio: float, n: int) -> float:
+    """
+    Sum of ratio**j for j in [0, n), computed with expm1 so ratios close to 1 stay accurate.
+    """
+    if n <= 0:
+        return 0.0
+    if ratio == 1.0:
+        return float(n)
+    log_ratio = math.log(ratio)
+    return math.expm1(n * log_ratio) / math.expm1(log_ratio)
+
+
+def _utility(spending: ArrayLike, gamma: ArrayLike) -> np.ndarray:
+    """
+    Monthly utility of spending, broadcasting over arrays: log utility where gamma == 0,
+    power utility spending**gamma elsewhere.
+    """
+    spending = np.asarray(spending, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(gamma == 0, np.log(spending), np.power(spending, gamma))
 
 
 def simulate_with_retirement(
@@ -40,12 +116,49 @@ def simulate_with_retirement(
     utility_exponent_pre_retire: float,  # 0 -> log utility; else power utility with exponent utility_exponent_pre_retire
     utility_exponent_post_retire: Optional[float],
     utility_multiplier_post_retire: float,
+    engine: str = "loop",
 ) -> Dict[str, float]:
     """
     Deterministic monthly simulation.
 
+    `engine` selects how the model is evaluated: "loop" walks every month, "closed_form"
+    uses simulate_with_retirement_closed_form, "plan" evaluates the cached
+    compile_plan(retire_age, ...) for this spending.
+
     Returns a dict with keys: total_enjoyment, final_wealth, bankrupt (bool).
     """
+    if engine == "closed_form":
+        return simulate_with_retirement_closed_form(
+            initial_age=initial_age,
+            final_age=final_age,
+            initial_wealth=initial_wealth,
+            initial_monthly_income=initial_monthly_income,
+            income_annual_growth=income_annual_growth,
+            retire_age=retire_age,
+            retired_monthly_income=retired_monthly_income,
+            investment_annual_growth=investment_annual_growth,
+            monthly_spending=monthly_spending,
+            utility_exponent_pre_retire=utility_exponent_pre_retire,
+            utility_exponent_post_retire=utility_exponent_post_retire,
+            utility_multiplier_post_retire=utility_multiplier_post_retire,
+        )
+    if engine == "plan":
+        return compile_plan(
+            initial_age=initial_age,
+            final_age=final_age,
+            initial_wealth=initial_wealth,
+            initial_monthly_income=initial_monthly_income,
+            income_annual_growth=income_annual_growth,
+            retire_age=retire_age,
+            retired_monthly_income=retired_monthly_income,
+            investment_annual_growth=investment_annual_growth,
+            utility_exponent_pre_retire=utility_exponent_pre_retire,
+            utility_exponent_post_retire=utility_exponent_post_retire,
+            utility_multiplier_post_retire=utility_multiplier_post_retire,
+        ).simulate(monthly_spending)
+    if engine != "loop":
+        raise ValueError(f"Unknown simulation engine {engine!r}; expected one of {SIMULATION_ENGINES}")
+
     months = int((final_age - initial_age) * MONTHS_PER_YEAR)
     # monthly rate equivalents
     alpha_m = (1 + income_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
@@ -89,27 +202,1058 @@ def simulate_with_retirement(
     return {"total_enjoyment": total_enjoyment, "final_wealth": W, "bankrupt": bankrupt}
 
 
+def simulate_with_retirement_closed_form(
+    initial_age: float,
+    final_age: float,
+    initial_wealth: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retire_age: float,
+    retired_monthly_income: float,
+    investment_annual_growth: float,
+    monthly_spending: float,
+    utility_exponent_pre_retire: float,
+    utility_exponent_post_retire: Optional[float],
+    utility_multiplier_post_retire: float,
+) -> Dict[str, float]:
+    """
+    Closed-form evaluation of simulate_with_retirement in O(1) `math` calls.
+
+    With g = 1 + beta_m and a = 1 + alpha_m, the K working months and M = months - K
+    retired months give
+        W_K = W_0 g^K + x_0 sum_j a^j g^(K-1-j) - s (g^K - 1) / (g - 1)
+        W_T = W_K g^M + (x_ret - s) (g^M - 1) / (g - 1)
+    and the enjoyment is the (constant) monthly utility of each phase times an
+    arithmetic series of linear age factors.
+
+    The retirement month follows the loop's accumulated-age convention
+    (see retire_month_index); results match the loop up to floating-point rounding.
+
+    Returns a dict with keys: total_enjoyment, final_wealth, bankrupt (bool).
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    alpha_m = (1 + income_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    beta_m = (1 + investment_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    g = 1 + beta_m
+    a = 1 + alpha_m
+
+    k_retire = retire_month_index(initial_age, final_age, retire_age)
+    m_retired = months - k_retire
+
+    # working phase: geometric income growth, constant spending
+    income_fv = 0.0
+    if k_retire > 0:
+        income_fv = initial_monthly_income * g ** (k_retire - 1) * _geometric_sum(a / g, k_retire)
+    W = initial_wealth * g**k_retire + income_fv - monthly_spending * _geometric_sum(g, k_retire)
+    # retired phase: constant income and spending
+    W = W * g**m_retired + (retired_monthly_income - monthly_spending) * _geometric_sum(g, m_retired)
+
+    # sum of age factors 1 - k / (12 * (final_age - initial_age)) over [0, K) and [K, months)
+    horizon_months = (final_age - initial_age) * MONTHS_PER_YEAR
+    weight_pre = k_retire - (k_retire * (k_retire - 1) / 2) / horizon_months
+    weight_post = m_retired - ((k_retire + months - 1) * m_retired / 2) / horizon_months
+
+    gamma_post = utility_exponent_post_retire if utility_exponent_post_retire is not None else utility_exponent_pre_retire
+    if utility_exponent_pre_retire == 0:
+        utility_pre = math.log(monthly_spending)
+    else:
+        utility_pre = monthly_spending**utility_exponent_pre_retire
+    if gamma_post == 0:
+        utility_post = math.log(monthly_spending)
+    else:
+        utility_post = monthly_spending**gamma_post
+
+    total_enjoyment = utility_pre * weight_pre + utility_post * utility_multiplier_post_retire * weight_post
+
+    bankrupt = W < 0
+    return {"total_enjoyment": total_enjoyment, "final_wealth": W, "bankrupt": bankrupt}
+
+
+def simulate_with_retirement_vectorized(
+    initial_age: float,
+    final_age: float,
+    initial_wealth: ArrayLike,
+    initial_monthly_income: ArrayLike,
+    income_annual_growth: ArrayLike,
+    retire_age: ArrayLike,
+    retired_monthly_income: ArrayLike,
+    investment_annual_growth: ArrayLike,
+    monthly_spending: ArrayLike,
+    utility_exponent_pre_retire: ArrayLike,
+    utility_exponent_post_retire: Optional[ArrayLike],
+    utility_multiplier_post_retire: ArrayLike,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized counterpart of simulate_with_retirement.
+
+    Every argument except initial_age / final_age (which fix the month count) may be a
+    NumPy array; all arguments are broadcast together and every scenario is stepped
+    through the monthly loop at once. The per-phase utilities do not change over time, so
+    they are computed once and the loop only updates wealth and accumulates enjoyment.
+
+    Returns a dict with keys total_enjoyment, final_wealth, bankrupt, each an array with
+    the broadcast shape of the inputs.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    ages = np.asarray(age_schedule(initial_age, months))
+    age_factor = np.maximum(0.0, 1.0 - (ages[:months] - initial_age) / (final_age - initial_age))
+
+    if utility_exponent_post_retire is None:
+        utility_exponent_post_retire = utility_exponent_pre_retire
+
+    shape = np.broadcast_shapes(
+        np.shape(initial_wealth),
+        np.shape(initial_monthly_income),
+        np.shape(income_annual_growth),
+        np.shape(retire_age),
+        np.shape(retired_monthly_income),
+        np.shape(investment_annual_growth),
+        np.shape(monthly_spending),
+        np.shape(utility_exponent_pre_retire),
+        np.shape(utility_exponent_post_retire),
+        np.shape(utility_multiplier_post_retire),
+    )
+
+    alpha_m = (1 + np.asarray(income_annual_growth, dtype=float)) ** (1 / MONTHS_PER_YEAR) - 1
+    beta_m = (1 + np.asarray(investment_annual_growth, dtype=float)) ** (1 / MONTHS_PER_YEAR) - 1
+    k_retire = np.minimum(np.searchsorted(ages, retire_age, side="left"), months)
+
+    spending = np.asarray(monthly_spending, dtype=float)
+    utility_pre = _utility(spending, utility_exponent_pre_retire)
+    utility_post = _utility(spending, utility_exponent_post_retire) * utility_multiplier_post_retire
+
+    W = np.broadcast_to(np.asarray(initial_wealth, dtype=float), shape).copy()
+    x_month = np.broadcast_to(np.asarray(initial_monthly_income, dtype=float), shape).copy()
+    total_enjoyment = np.zeros(shape)
+
+    for k in range(months):
+        working = k < k_retire
+        x_month_now = np.where(working, x_month, retired_monthly_income)
+        total_enjoyment += np.where(working, utility_pre, utility_post) * age_factor[k]
+
+        # wealth update
+        W = W * (1 + beta_m) + (x_month_now - spending)
+
+        # income keeps growing while the next month is still a working month
+        x_month = np.where(k + 1 < k_retire, x_month * (1 + alpha_m), x_month)
+
+    return {"total_enjoyment": total_enjoyment, "final_wealth": W, "bankrupt": W < 0}
+
+
+class RetirementPlan:
+    """
+    One retirement age and parameter set compiled into per-month arrays, so that a
+    spending evaluation is a dot product instead of a monthly loop.
+
+    With T = months, g = 1 + beta_m and the loop's month-k net flow income[k] - s added at
+    the end of month k,
+        final_wealth(s) = initial_wealth * g^T + growth_to_end @ (income - s)
+    where growth_to_end[k] = g^(T-1-k). Monthly utility is u(s; gamma) * age_factor * L with
+    gamma and L constant within each phase, so enjoyment separates into
+        total_enjoyment(s) = u(s; gamma_pre) * weight_pre + u(s; gamma_post) * L * weight_post
+    with weight_pre / weight_post the sums of the age factors over the working / retired
+    months. The weights do not depend on spending or on the utility parameters, so
+    enjoyment for any spending, exponent or multiplier costs O(1). Build plans with
+    compile_plan (cached), not directly; the arrays are read-only because cached plans
+    share them.
+    """
+
+    def __init__(
+        self,
+        retire_month: int,
+        initial_wealth: float,
+        initial_growth: float,
+        income: np.ndarray,
+        growth_to_end: np.ndarray,
+        weight_pre: float,
+        weight_post: float,
+        utility_exponent_pre_retire: float,
+        utility_exponent_post_retire: Optional[float],
+        utility_multiplier_post_retire: float,
+    ):
+        self.months = len(income)
+        self.retire_month = retire_month
+        self.initial_wealth = initial_wealth
+        self.initial_growth = initial_growth
+        self.income = income
+        self.growth_to_end = growth_to_end
+        self.weight_pre = weight_pre
+        self.weight_post = weight_post
+        self.utility_exponent_pre_retire = utility_exponent_pre_retire
+        self.utility_exponent_post_retire = utility_exponent_post_retire
+        self.utility_multiplier_post_retire = utility_multiplier_post_retire
+
+    def final_wealth(self, monthly_spending: ArrayLike) -> ArrayLike:
+        """Final wealth for a spending (float) or an array of spendings (array of the same shape)."""
+        spending = np.asarray(monthly_spending, dtype=float)
+        W = self.initial_wealth * self.initial_growth + (self.income - spending[..., None]) @ self.growth_to_end
+        return float(W) if W.ndim == 0 else W
+
+    def total_enjoyment(
+        self,
+        monthly_spending: ArrayLike,
+        utility_exponent_pre_retire: Optional[ArrayLike] = None,
+        utility_exponent_post_retire: Optional[ArrayLike] = None,
+        utility_multiplier_post_retire: Optional[ArrayLike] = None,
+    ) -> ArrayLike:
+        """
+        Total enjoyment from the separable form, broadcasting spending and the utility
+        parameters together (a float if all are scalars). Utility parameters left as None
+        take the plan's values; as in simulate_with_retirement, a post-retirement exponent
+        of None follows the pre-retirement one.
+        """
+        gamma_pre = utility_exponent_pre_retire
+        if gamma_pre is None:
+            gamma_pre = self.utility_exponent_pre_retire
+        gamma_post = utility_exponent_post_retire
+        if gamma_post is None:
+            gamma_post = self.utility_exponent_post_retire
+        if gamma_post is None:
+            gamma_post = gamma_pre
+        if utility_multiplier_post_retire is None:
+            utility_multiplier_post_retire = self.utility_multiplier_post_retire
+        # skip a phase without months, so log(0) spending there does not give 0 * -inf
+        enjoyment = np.zeros(np.broadcast_shapes(np.shape(monthly_spending), np.shape(gamma_pre), np.shape(gamma_post)))
+        if self.weight_pre:
+            enjoyment = enjoyment + _utility(monthly_spending, gamma_pre) * self.weight_pre
+        if self.weight_post:
+            enjoyment = enjoyment + _utility(monthly_spending, gamma_post) * utility_multiplier_post_retire * self.weight_post
+        return float(enjoyment) if np.ndim(enjoyment) == 0 else enjoyment
+
+    def simulate(self, monthly_spending: ArrayLike) -> Dict[str, ArrayLike]:
+        """
+        Same result as simulate_with_retirement for this plan's parameters (up to
+        floating-point rounding). Returns a dict with keys: total_enjoyment, final_wealth,
+        bankrupt.
+        """
+        W = self.final_wealth(monthly_spending)
+        return {"total_enjoyment": self.total_enjoyment(monthly_spending), "final_wealth": W, "bankrupt": W < 0}
+
+
+def compile_plan(
+    retire_age: float,
+    initial_age: float,
+    final_age: float,
+    initial_wealth: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retired_monthly_income: float,
+    investment_annual_growth: float,
+    utility_exponent_pre_retire: float,
+    utility_exponent_post_retire: Optional[float],
+    utility_multiplier_post_retire: float,
+) -> RetirementPlan:
+    """
+    RetirementPlan for one retire_age and the usual sim_kwargs (everything but spending).
+
+    Income path, growth factors, retirement switch month and age-factor weights follow the
+    loop of simulate_with_retirement (accumulated-age convention, see retire_month_index).
+    The arrays and weights are memoized on the non-utility parameters, so repeated calls,
+    e.g. every probe of a spending search, the enjoyment evaluation and sweeps over the
+    utility parameters, reuse one compilation.
+    """
+    # positional call: lru_cache keys keyword arguments by their order
+    retire_month, initial_growth, income, growth_to_end, weight_pre, weight_post = _compile_plan(
+        retire_age,
+        initial_age,
+        final_age,
+        initial_wealth,
+        initial_monthly_income,
+        income_annual_growth,
+        retired_monthly_income,
+        investment_annual_growth,
+    )
+    return RetirementPlan(
+        retire_month=retire_month,
+        initial_wealth=initial_wealth,
+        initial_growth=initial_growth,
+        income=income,
+        growth_to_end=growth_to_end,
+        weight_pre=weight_pre,
+        weight_post=weight_post,
+        utility_exponent_pre_retire=utility_exponent_pre_retire,
+        utility_exponent_post_retire=utility_exponent_post_retire,
+        utility_multiplier_post_retire=utility_multiplier_post_retire,
+    )
+
+
+@lru_cache(maxsize=256)
+def _compile_plan(
+    retire_age: float,
+    initial_age: float,
+    final_age: float,
+    initial_wealth: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retired_monthly_income: float,
+    investment_annual_growth: float,
+) -> Tuple[int, float, np.ndarray, np.ndarray, float, float]:
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    alpha_m = (1 + income_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    beta_m = (1 + investment_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    k_retire = retire_month_index(initial_age, final_age, retire_age)
+    month = np.arange(months)
+    retired = month >= k_retire
+
+    income = np.where(retired, retired_monthly_income, initial_monthly_income * (1 + alpha_m) ** month)
+    growth_to_end = (1 + beta_m) ** (months - 1 - month).astype(float)
+    income.setflags(write=False)
+    growth_to_end.setflags(write=False)
+
+    ages = np.asarray(age_schedule(initial_age, months))
+    age_factor = np.maximum(0.0, 1.0 - (ages[:months] - initial_age) / (final_age - initial_age))
+    weight_pre = float(age_factor[:k_retire].sum())
+    weight_post = float(age_factor[k_retire:].sum())
+    return k_retire, (1 + beta_m) ** months, income, growth_to_end, weight_pre, weight_post
+
+
+def retire_month_table(
+    initial_age: float,
+    final_age: float,
+    initial_wealth: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retired_monthly_income: float,
+    investment_annual_growth: float,
+    **utility_kwargs,
+) -> Dict[str, np.ndarray]:
+    """
+    Single O(months) sweep covering every candidate retirement month K = 0..months.
+
+    The working phase does not depend on when retirement happens, so one forward pass
+    gives wealth at retirement (split into a spending-free part and a per-dollar-of-spending
+    part) and the prefix sums of the age factors for every K. A backward pass gives the
+    retired-phase growth factor and annuity for every remaining length. Combining them,
+    final wealth for retirement month K is wealth_intercept[K] - wealth_slope[K] * spending
+    and total enjoyment is u_pre(s) * weight_pre[K] + u_post(s) * L * weight_post[K].
+
+    Utility parameters are accepted (and ignored) so the usual sim_kwargs can be passed.
+
+    Returns a dict of arrays of length months + 1: retire_month, retire_age (the age at the
+    start of month K on the loop's accumulated-age schedule), wealth_intercept,
+    wealth_slope, max_spending (= intercept / slope), weight_pre, weight_post.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    alpha_m = (1 + income_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    beta_m = (1 + investment_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    ages = np.asarray(age_schedule(initial_age, months))
+    age_factor = np.maximum(0.0, 1.0 - (ages[:months] - initial_age) / (final_age - initial_age))
+
+    # forward sweep: wealth at the start of month K if every month before K was a working month
+    wealth_pre = np.empty(months + 1)  # with zero spending
+    spend_pre = np.empty(months + 1)  # wealth lost per dollar of monthly spending
+    W = initial_wealth
+    S = 0.0
+    x_month = initial_monthly_income
+    for k in range(months + 1):
+        wealth_pre[k] = W
+        spend_pre[k] = S
+        W = W * (1 + beta_m) + x_month
+        S = S * (1 + beta_m) + 1.0
+        x_month *= 1 + alpha_m
+
+    # backward sweep: growth factor and annuity of the remaining months - K retired months
+    growth_post = np.empty(months + 1)
+    annuity_post = np.empty(months + 1)
+    G = 1.0
+    A = 0.0
+    for k in range(months, -1, -1):
+        growth_post[k] = G
+        annuity_post[k] = A
+        G *= 1 + beta_m
+        A = A * (1 + beta_m) + 1.0
+
+    wealth_intercept = wealth_pre * growth_post + retired_monthly_income * annuity_post
+    wealth_slope = spend_pre * growth_post + annuity_post
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_spending = np.where(
+            wealth_slope > 0, wealth_intercept / wealth_slope, np.where(wealth_intercept >= 0, np.inf, -np.inf)
+        )
+
+    weight_pre = np.concatenate(([0.0], np.cumsum(age_factor)))
+    weight_post = weight_pre[-1] - weight_pre
+
+    return {
+        "retire_month": np.arange(months + 1),
+        "retire_age": ages,
+        "wealth_intercept": wealth_intercept,
+        "wealth_slope": wealth_slope,
+        "max_spending": max_spending,
+        "weight_pre": weight_pre,
+        "weight_post": weight_post,
+    }
+
+
+def solve_max_feasible_spending(
+    retire_age: float,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    engine: str = "loop",
+    **sim_kwargs,
+) -> Dict[str, Optional[float]]:
+    """
+    Exact maximum feasible spending, using that final wealth is affine in monthly_spending
+    (W_T = A - B * s). A and B are fitted from two simulations at the ends of the grid, the
+    continuous optimum is A / B and it is snapped down to the grid [spend_min, spend_max]
+    with step `step`.
+
+    Returns a dict with keys: max_spending (continuous optimum), best_monthly_spending
+    (snapped grid value), total_enjoyment, final_wealth. All but max_spending are None if
+    no spending in the grid is feasible.
+    """
+    spend_range = range(spend_min, spend_max + step, step)
+    s_low = spend_range[0]
+    s_high = spend_range[-1]
+
+    def simulate(y: int) -> Dict[str, float]:
+        return simulate_with_retirement(retire_age=retire_age, monthly_spending=y, engine=engine, **sim_kwargs)
+
+    res_low = simulate(s_low)
+    res_high = simulate(s_high)
+    slope = (res_low["final_wealth"] - res_high["final_wealth"]) / (s_high - s_low) if s_high > s_low else 0.0
+    if slope > 0:
+        max_spending = s_low + res_low["final_wealth"] / slope
+    else:
+        # final wealth does not depend on spending (e.g. an empty horizon)
+        max_spending = math.inf if res_low["final_wealth"] >= 0 else -math.inf
+
+    result = {
+        "max_spending": max_spending,
+        "best_monthly_spending": None,
+        "total_enjoyment": None,
+        "final_wealth": None,
+    }
+    if res_low["final_wealth"] < 0:
+        # smallest spending already infeasible
+        return result
+    if res_high["final_wealth"] >= 0:
+        best_s, best_res = s_high, res_high
+    else:
+        best_s_index = min(int((max_spending - s_low) // step), len(spend_range) - 1)
+        best_s = spend_range[best_s_index]
+        best_res = simulate(best_s)
+        # guard against rounding when the optimum sits exactly on a grid point: A / B can
+        # land just above it (infeasible) or just below it (one grid step too low)
+        if best_res["final_wealth"] < 0:
+            while best_res["final_wealth"] < 0 and best_s_index > 0:
+                best_s_index -= 1
+                best_s = spend_range[best_s_index]
+                best_res = simulate(best_s)
+        else:
+            while best_s_index + 1 < len(spend_range):
+                next_res = simulate(spend_range[best_s_index + 1])
+                if next_res["final_wealth"] < 0:
+                    break
+                best_s_index += 1
+                best_s, best_res = spend_range[best_s_index], next_res
+
+    result["best_monthly_spending"] = best_s
+    result["total_enjoyment"] = best_res["total_enjoyment"]
+    result["final_wealth"] = best_res["final_wealth"]
+    return result
+
+
+def find_root(
+    func: Callable[[float], float],
+    x_low: float,
+    x_high: float,
+    target: float = 0.0,
+    tolerance: float = 1.0,
+    max_iterations: int = 100,
+    f_low: Optional[float] = None,
+    f_high: Optional[float] = None,
+) -> Dict[str, object]:
+    """
+    Bracketing root-finder (Illinois regula falsi) for func(x) = target on [x_low, x_high].
+
+    func(x_high) - target must be non-zero and differ in sign from func(x_low) - target,
+    else ValueError; f_low / f_high are func(x_low) / func(x_high) when already known.
+    Points whose residual has the sign of x_high's are on the high side, all others
+    (residual 0 included) on the low side. Iteration stops once the bracket is no wider
+    than `tolerance`, or after `max_iterations` evaluations of func.
+
+    Returns a dict with keys: root (= low, the last point found on the low side), value
+    (func(root)), low, high (final bracket), iterations (func evaluations after the two
+    ends), converged (bracket no wider than tolerance).
+    """
+    if f_low is None:
+        f_low = func(x_low)
+    if f_high is None:
+        f_high = func(x_high)
+    r_low, r_high = f_low - target, f_high - target
+    high_sign = np.sign(r_high)
+    if high_sign == 0 or np.sign(r_low) == high_sign:
+        raise ValueError(f"func - target does not change sign from x_low to x_high on [{x_low}, {x_high}]")
+
+    w_low, w_high = r_low, r_high  # Illinois-weighted residuals
+    kept = 0  # -1 / +1: which end the previous iteration replaced
+    closing = None  # next point to evaluate when the secant estimate is already within tolerance
+    closing_from = None  # side (True: high) of the point the closing probe steps away from
+    widths = [abs(x_high - x_low)]
+    iterations = 0
+    # Each iteration evaluates func once at the secant point of the Illinois-weighted
+    # bracket (the midpoint when that is not strictly inside) and keeps the sub-bracket
+    # with the sign change; keeping the same end twice halves the other end's weight,
+    # avoiding the one-sided stalls of plain regula falsi. For an affine func the first
+    # secant point and its closing probe are enough.
+    while abs(x_high - x_low) > tolerance and iterations < max_iterations:
+        slope = (w_high - w_low) / (x_high - x_low)
+        if closing is not None:
+            x = closing
+        elif len(widths) > 3 and widths[-1] > widths[-4] / 2:
+            # three iterations without halving the bracket (flat or noisy steps): bisect
+            x = (x_low + x_high) / 2
+        else:
+            x = x_low - w_low / slope if slope != 0 else x_low
+        if not min(x_low, x_high) < x < max(x_low, x_high):
+            x = (x_low + x_high) / 2
+        value = func(x)
+        residual = value - target
+        on_high_side = np.sign(residual) == high_sign
+        iterations += 1
+
+        probe_failed = closing is not None and on_high_side == closing_from
+        closing = None
+        if not probe_failed and slope != 0 and abs(residual / slope) <= tolerance:
+            # the secant estimate puts the root within tolerance of x: step just across
+            # it so the bracket closes around it; if the probe stays on x's side, bisect
+            distance = min(tolerance, max(2 * abs(residual / slope), 1e-9 * max(1.0, abs(x))))
+            direction = 1.0 if x_high > x_low else -1.0
+            closing = x - direction * distance if on_high_side else x + direction * distance
+            closing_from = on_high_side
+        if on_high_side:
+            x_high, w_high = x, residual
+            if kept == 1:
+                w_low /= 2
+            kept = 1
+        else:
+            x_low, f_low, w_low = x, value, residual
+            if kept == -1:
+                w_high /= 2
+            kept = -1
+        widths.append(abs(x_high - x_low))
+        if probe_failed:
+            widths.append(float("inf"))  # force a bisection next
+
+    return {
+        "root": x_low,
+        "value": f_low,
+        "low": x_low,
+        "high": x_high,
+        "iterations": iterations,
+        "converged": abs(x_high - x_low) <= tolerance,
+    }
+
+
+def solve_spending_root(
+    retire_age: float,
+    spend_min: float,
+    spend_max: float,
+    tolerance: float = 1.0,
+    engine: str = "loop",
+    **sim_kwargs,
+) -> Dict[str, object]:
+    """
+    Continuous maximum feasible spending: the largest spending on [spend_min, spend_max]
+    with final_wealth(s) >= 0, found with find_root to within `tolerance` dollars of the
+    root of final_wealth(s) = 0, with no spending grid. Assumes only that final wealth
+    decreases with spending; for the affine model it takes one secant step and one
+    closing probe.
+
+    Returns a dict with keys: max_spending (spend_max if that is still feasible, None if
+    spend_min is not), total_enjoyment, final_wealth (at max_spending), iterations,
+    converged.
+    """
+    simulate = _spending_simulator(retire_age, engine, sim_kwargs)
+    res_low = simulate(spend_min)
+    res_high = simulate(spend_max)
+    result = {
+        "max_spending": None,
+        "total_enjoyment": None,
+        "final_wealth": None,
+        "iterations": 0,
+        "converged": True,
+    }
+    if res_low["final_wealth"] < 0:
+        return result
+    if res_high["final_wealth"] >= 0:
+        best_s, best_res = spend_max, res_high
+    else:
+        root = find_root(
+            lambda y: simulate(y)["final_wealth"],
+            spend_min,
+            spend_max,
+            tolerance=tolerance,
+            f_low=res_low["final_wealth"],
+            f_high=res_high["final_wealth"],
+        )
+        best_s, best_res = root["low"], simulate(root["low"])
+        result["iterations"] = root["iterations"]
+        result["converged"] = root["converged"]
+
+    result["max_spending"] = best_s
+    result["total_enjoyment"] = best_res["total_enjoyment"]
+    result["final_wealth"] = best_res["final_wealth"]
+    return result
+
+
+def max_feasible_spending_vectorized(
+    retire_ages: ArrayLike,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    **sim_kwargs,
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the whole spending grid [spend_min, spend_max] (step `step`) for every retire
+    age in a single simulate_with_retirement_vectorized call, and pick for each age the grid
+    point just below the first infeasible one (the same point bisect would find).
+
+    Returns a dict with arrays aligned with retire_ages: best_monthly_spending,
+    total_enjoyment, final_wealth (NaN where no spending in the grid is feasible).
+    """
+    spend_range = range(spend_min, spend_max + step, step)
+    retire_ages = np.atleast_1d(np.asarray(retire_ages, dtype=float))
+    spend_grid = np.asarray(spend_range, dtype=float)
+
+    res = simulate_with_retirement_vectorized(
+        retire_age=retire_ages[:, None], monthly_spending=spend_grid[None, :], **sim_kwargs
+    )
+    infeasible = res["final_wealth"] < 0
+    idx_first_infeas = np.where(infeasible.any(axis=1), infeasible.argmax(axis=1), len(spend_range))
+    best_s_index = np.maximum(idx_first_infeas - 1, 0)
+    rows = np.arange(len(retire_ages))
+    has_feasible = idx_first_infeas > 0
+
+    return {
+        "best_monthly_spending": np.where(has_feasible, spend_grid[best_s_index], np.nan),
+        "total_enjoyment": np.where(has_feasible, res["total_enjoyment"][rows, best_s_index], np.nan),
+        "final_wealth": np.where(has_feasible, res["final_wealth"][rows, best_s_index], np.nan),
+    }
+
+
+def _batched_simulator(retire_ages: np.ndarray, engine: str, sim_kwargs: dict) -> Callable[[np.ndarray], Dict[str, np.ndarray]]:
+    """
+    (n_ages, k) spendings -> simulate_with_retirement results as (n_ages, k) arrays, row i
+    for retire_ages[i]: one simulate_with_retirement_vectorized call, or with engine="plan"
+    one dot product per compiled plan.
+    """
+    if engine == "plan":
+        plans = [compile_plan(retire_age=age, **sim_kwargs) for age in retire_ages]
+
+        def simulate(spending: np.ndarray) -> Dict[str, np.ndarray]:
+            results = [plan.simulate(row) for plan, row in zip(plans, spending)]
+            return {key: np.stack([res[key] for res in results]) for key in results[0]}
+
+        return simulate
+
+    def simulate(spending: np.ndarray) -> Dict[str, np.ndarray]:
+        return simulate_with_retirement_vectorized(
+            retire_age=retire_ages[:, None], monthly_spending=spending, **sim_kwargs
+        )
+
+    return simulate
+
+
+@lru_cache(maxsize=None)
+def _kary_cost_model(engine: str, months: int) -> Tuple[float, float]:
+    """
+    (seconds per batched call, seconds per probe) of the k-ary search kernel for `engine`
+    and `months`, timed once per process on a synthetic parameter set (best of three calls
+    with 1 and with 1024 probes).
+    """
+    sim_kwargs = {
+        "initial_age": 0.0,
+        "final_age": months / MONTHS_PER_YEAR,
+        "initial_wealth": 0.0,
+        "initial_monthly_income": 1.0,
+        "income_annual_growth": 0.01,
+        "retired_monthly_income": 0.0,
+        "investment_annual_growth": 0.03,
+        "utility_exponent_pre_retire": 0.0,
+        "utility_exponent_post_retire": None,
+        "utility_multiplier_post_retire": 1.0,
+    }
+    simulate = _batched_simulator(np.array([months / MONTHS_PER_YEAR / 2]), engine, sim_kwargs)
+    timings = []
+    for n_probes in (1, 1024):
+        spending = np.linspace(0.1, 1.0, n_probes)[None, :]
+        best = math.inf
+        for _ in range(3):
+            start = time.perf_counter()
+            simulate(spending)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    per_probe = max(timings[1] - timings[0], 0.0) / 1023
+    return max(timings[0] - per_probe, 0.0), per_probe
+
+
+def kary_branching(n_grid: int, months: int, n_ages: int = 1, engine: str = "loop") -> int:
+    """
+    Probes per round for max_feasible_spending_kary, from the calibrated cost model: with
+    k probes per age a round costs call + probe * n_ages * k seconds (plans are evaluated
+    one age at a time, so there the call cost is paid n_ages times) and the search needs
+    ceil(log(n_grid + 1) / log(k + 1)) rounds; returns the k in KARY_BRANCHINGS (at most
+    the grid size) with the lowest predicted total.
+    """
+    per_call, per_probe = _kary_cost_model("plan" if engine == "plan" else "vectorized", months)
+    if engine == "plan":
+        per_call *= n_ages
+    candidates = [k for k in KARY_BRANCHINGS if k <= max(n_grid, 1)] or [1]
+
+    def predicted_seconds(k: int) -> float:
+        rounds = math.ceil(math.log(n_grid + 1) / math.log(k + 1))
+        return rounds * (per_call + per_probe * n_ages * k)
+
+    return min(candidates, key=predicted_seconds)
+
+
+def max_feasible_spending_kary(
+    retire_ages: ArrayLike,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    branching: Optional[int] = None,
+    engine: str = "loop",
+    **sim_kwargs,
+) -> Dict[str, np.ndarray]:
+    """
+    k-ary search of the spending grid [spend_min, spend_max] (step `step`), run for all
+    retire ages in lockstep: every round evaluates `branching` = k evenly spaced grid
+    points inside each age's bracket in one batched call (see _batched_simulator) and
+    shrinks every bracket by a factor of about k + 1. k = 1 is plain bisection; the default
+    None picks k with kary_branching. Like bisect it only assumes that feasibility is
+    monotone in spending, and it finds the same grid point.
+
+    `engine="plan"` evaluates compiled plans; other engines use
+    simulate_with_retirement_vectorized.
+
+    Returns a dict with arrays aligned with retire_ages: best_monthly_spending,
+    total_enjoyment, final_wealth (NaN where no spending in the grid is feasible).
+    """
+    spend_range = range(spend_min, spend_max + step, step)
+    n_grid = len(spend_range)
+    retire_ages = np.atleast_1d(np.asarray(retire_ages, dtype=float))
+    if branching is None:
+        months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+        branching = kary_branching(n_grid, months, len(retire_ages), engine)
+    if branching < 1:
+        raise ValueError("branching must be at least 1")
+    simulate = _batched_simulator(retire_ages, engine, sim_kwargs)
+
+    # grid indices below lo are feasible, indices from hi on are infeasible
+    lo = np.zeros(len(retire_ages), dtype=int)
+    hi = np.full(len(retire_ages), n_grid)
+    offsets = np.arange(1, branching + 1)
+    while (lo < hi).any():
+        probes = lo[:, None] + (hi - lo)[:, None] * offsets // (branching + 1)
+        probes = np.minimum(probes, n_grid - 1)
+        infeasible = simulate(spend_range.start + probes * float(step))["final_wealth"] < 0
+        active = (lo < hi)[:, None]
+        hi = np.where(active, np.where(infeasible, probes, hi[:, None]), hi[:, None]).min(axis=1)
+        lo = np.where(active, np.where(~infeasible, probes + 1, lo[:, None]), lo[:, None]).max(axis=1)
+
+    has_feasible = lo > 0
+    best_s = spend_range.start + np.maximum(lo - 1, 0) * float(step)
+    best_res = simulate(best_s[:, None])
+    return {
+        "best_monthly_spending": np.where(has_feasible, best_s, np.nan),
+        "total_enjoyment": np.where(has_feasible, best_res["total_enjoyment"][:, 0], np.nan),
+        "final_wealth": np.where(has_feasible, best_res["final_wealth"][:, 0], np.nan),
+    }
+
+
+def max_feasible_spending_by_retire_month(
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    retire_months: Optional[ArrayLike] = None,
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Maximum feasible spending and its enjoyment for every retirement month (or the given
+    `retire_months`) from a single retire_month_table sweep.
+
+    The continuous optimum of each month is snapped down to the grid [spend_min, spend_max]
+    with step `step`, as in solve_max_feasible_spending.
+
+    Returns a DataFrame with columns retire_month, retire_age, max_spending,
+    best_monthly_spending, total_enjoyment, final_wealth (NaN where no spending in the grid
+    is feasible).
+    """
+    table = retire_month_table(**sim_kwargs)
+    if retire_months is not None:
+        table = {key: values[np.asarray(retire_months, dtype=int)] for key, values in table.items()}
+
+    spend_range = range(spend_min, spend_max + step, step)
+    spend_grid = np.asarray(spend_range, dtype=float)
+    max_spending = table["max_spending"]
+
+    with np.errstate(invalid="ignore"):
+        best_s_index = np.floor((max_spending - spend_grid[0]) / step)
+    best_s_index = np.clip(np.nan_to_num(best_s_index, posinf=len(spend_range)), -1, len(spend_range) - 1).astype(int)
+
+    def final_wealth(index: np.ndarray) -> np.ndarray:
+        return table["wealth_intercept"] - table["wealth_slope"] * spend_grid[np.maximum(index, 0)]
+
+    # guard against rounding when the optimum sits exactly on a grid point, in either
+    # direction, as in solve_max_feasible_spending
+    infeasible = (best_s_index >= 0) & (final_wealth(best_s_index) < 0)
+    while infeasible.any():
+        best_s_index = np.where(infeasible, best_s_index - 1, best_s_index)
+        infeasible = (best_s_index >= 0) & (final_wealth(best_s_index) < 0)
+    last_index = len(spend_range) - 1
+    step_up = (best_s_index < last_index) & (final_wealth(np.minimum(best_s_index + 1, last_index)) >= 0)
+    while step_up.any():
+        best_s_index = np.where(step_up, best_s_index + 1, best_s_index)
+        step_up = (best_s_index < last_index) & (final_wealth(np.minimum(best_s_index + 1, last_index)) >= 0)
+
+    has_feasible = best_s_index >= 0
+    best_s = np.where(has_feasible, spend_grid[np.maximum(best_s_index, 0)], np.nan)
+
+    gamma_pre = sim_kwargs["utility_exponent_pre_retire"]
+    gamma_post = sim_kwargs["utility_exponent_post_retire"]
+    if gamma_post is None:
+        gamma_post = gamma_pre
+    with np.errstate(invalid="ignore"):
+        total_enjoyment = (
+            _utility(best_s, gamma_pre) * table["weight_pre"]
+            + _utility(best_s, gamma_post) * sim_kwargs["utility_multiplier_post_retire"] * table["weight_post"]
+        )
+
+    return pd.DataFrame(
+        {
+            "retire_month": table["retire_month"],
+            "retire_age": table["retire_age"],
+            "max_spending": max_spending,
+            "best_monthly_spending": best_s,
+            "total_enjoyment": np.where(has_feasible, total_enjoyment, np.nan),
+            "final_wealth": np.where(has_feasible, final_wealth(best_s_index), np.nan),
+        }
+    )
+
+
+def utility_exponent_sweep(
+    ages: list,
+    exponents_pre: list,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    exponents_post: Optional[list] = None,
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Enjoyment at the maximum feasible spending for every retire age and every pair of
+    utility exponents in exponents_pre x exponents_post (default: post = pre).
+
+    Feasibility does not depend on utility, so the best spending of each age comes from one
+    max_feasible_spending_by_retire_month sweep, and the enjoyment of all exponent pairs
+    from the separable weights of the age's RetirementPlan, without re-simulating. The
+    utility exponents in sim_kwargs are ignored.
+
+    Returns a DataFrame with columns retire_age, utility_exponent_pre_retire,
+    utility_exponent_post_retire, best_monthly_spending, total_enjoyment (NaN where no
+    spending in the grid is feasible), sorted by exponents then retire_age.
+    """
+    pairs = [
+        (gamma_pre, gamma_pre if gamma_post is None else gamma_post)
+        for gamma_pre in exponents_pre
+        for gamma_post in (exponents_post if exponents_post is not None else [None])
+    ]
+    gammas_pre, gammas_post = np.asarray(pairs, dtype=float).reshape(-1, 2).T
+
+    k_retire = [retire_month_index(sim_kwargs["initial_age"], sim_kwargs["final_age"], age) for age in ages]
+    best_s = max_feasible_spending_by_retire_month(
+        spend_min=spend_min, spend_max=spend_max, step=step, retire_months=k_retire, **sim_kwargs
+    )["best_monthly_spending"].to_numpy()
+
+    frames = []
+    for age, s in zip(ages, best_s):
+        plan = compile_plan(retire_age=age, **sim_kwargs)
+        with np.errstate(invalid="ignore"):
+            enjoyment = plan.total_enjoyment(
+                s, utility_exponent_pre_retire=gammas_pre, utility_exponent_post_retire=gammas_post
+            )
+        frames.append(
+            pd.DataFrame(
+                {
+                    "retire_age": age,
+                    "utility_exponent_pre_retire": gammas_pre,
+                    "utility_exponent_post_retire": gammas_post,
+                    "best_monthly_spending": s,
+                    "total_enjoyment": np.where(np.isnan(s), np.nan, enjoyment),
+                }
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(
+        ["utility_exponent_pre_retire", "utility_exponent_post_retire", "retire_age"], kind="stable"
+    ).reset_index(drop=True)
+
+
+def _spending_simulator(retire_age: float, engine: str, sim_kwargs: dict) -> Callable[[float], Dict[str, float]]:
+    """
+    monthly_spending -> simulate_with_retirement result for one retire age. With
+    engine="plan" the plan is compiled once and shared by every call.
+    """
+    if engine == "plan":
+        return compile_plan(retire_age=retire_age, **sim_kwargs).simulate
+
+    def simulate(monthly_spending: float) -> Dict[str, float]:
+        return simulate_with_retirement(
+            retire_age=retire_age, monthly_spending=monthly_spending, engine=engine, **sim_kwargs
+        )
+
+    return simulate
+
+
+def max_feasible_spending_staircase(
+    ages: list,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    engine: str = "loop",
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Grid search of max_feasible_spending_for_retire_age for many ages at once, walking the
+    (retire_age x spending grid) feasibility frontier as a staircase.
+
+    Working longer never lowers the maximum feasible spending, so ages are visited in
+    increasing order and each search starts from the previous age's answer: if that grid
+    point is still feasible, the next infeasible one is found by galloping upwards (steps
+    of 1, 2, 4, ...) and bisecting the last gap. The frontier only moves up, so the whole
+    table costs O(ages + log grid) feasibility checks in the typical case, and never more
+    than O(ages * log grid). If the warm start is infeasible (the frontier went down, e.g.
+    for parameters where retiring later does not pay), that age falls back to bisect on
+    the grid below it, so the answer stays exact for any engine, including the loop.
+
+    Returns a DataFrame with columns retire_age, best_monthly_spending, total_enjoyment,
+    final_wealth (None where no spending in the grid is feasible), sorted by retire_age.
+    """
+    spend_range = range(spend_min, spend_max + step, step)
+    n_grid = len(spend_range)
+    rows = []
+    best_index = 0  # warm start: highest feasible grid index of the previous age
+    for age in sorted(ages):
+        simulate = _spending_simulator(age, engine, sim_kwargs)
+
+        def is_not_feasible(index: int) -> bool:
+            return simulate(spend_range[index])["final_wealth"] < 0
+
+        if is_not_feasible(best_index):
+            # frontier went down (or nothing was feasible yet): bisect below the warm start
+            idx_first_infeas = bisect.bisect_left(range(best_index), True, key=is_not_feasible)
+        else:
+            lo, gallop = best_index, 1
+            hi = n_grid
+            while lo + gallop < n_grid:
+                if is_not_feasible(lo + gallop):
+                    hi = lo + gallop
+                    break
+                lo += gallop
+                gallop *= 2
+            idx_first_infeas = bisect.bisect_left(range(n_grid), True, lo + 1, hi, key=is_not_feasible)
+
+        if idx_first_infeas == 0:
+            rows.append({"retire_age": age, "best_monthly_spending": None, "total_enjoyment": None, "final_wealth": None})
+            best_index = 0
+            continue
+        best_index = idx_first_infeas - 1
+        best_s = spend_range[best_index]
+        best_res = simulate(best_s)
+        rows.append(
+            {
+                "retire_age": age,
+                "best_monthly_spending": best_s,
+                "total_enjoyment": best_res["total_enjoyment"],
+                "final_wealth": best_res["final_wealth"],
+            }
+        )
+    return pd.DataFrame(rows, columns=["retire_age", "best_monthly_spending", "total_enjoyment", "final_wealth"])
+
+
 def max_feasible_spending_for_retire_age(
     retire_age: float,
     spend_min: int,
     spend_max: int,
     step: int,
+    engine: str = "loop",
+    method: str = "bisect",
+    branching: Optional[int] = None,
+    tolerance: float = 1.0,
     **sim_kwargs,
 ) -> Tuple[Optional[float], Optional[float], Optional[float]]:
     """
     Find the largest spending on a discretized grid [spend_min, spend_max] with step
     `step` such that simulate_with_retirement(..., monthly_spending=spend) yields final_wealth >= 0.
 
-    Uses Python's bisect on the boolean feasibility vector.
+    method="bisect" uses Python's bisect on the boolean feasibility vector and makes no
+    assumption about the model beyond monotonicity; method="exact" uses
+    solve_max_feasible_spending, which relies on final wealth being affine in spending;
+    method="vectorized" evaluates the whole grid at once with
+    max_feasible_spending_vectorized; method="single_pass" reads the answer off
+    max_feasible_spending_by_retire_month. `engine` is forwarded to
+    simulate_with_retirement (the vectorized and single-pass methods ignore it).
+    method="staircase" only differs from bisect across ages (see run_grid_ages).
+    method="kary" probes `branching` grid points per round in one batched call (see
+    max_feasible_spending_kary; None calibrates it). method="root" ignores the grid step
+    and returns the continuous optimum to within `tolerance` dollars (solve_spending_root).
 
     Returns (best_spend, total_enjoyment, final_wealth) or (None, None, None) if no
     feasible spend in the grid.
     """
+    if method == "exact":
+        res = solve_max_feasible_spending(
+            retire_age=retire_age, spend_min=spend_min, spend_max=spend_max, step=step, engine=engine, **sim_kwargs
+        )
+        return res["best_monthly_spending"], res["total_enjoyment"], res["final_wealth"]
+    if method == "root":
+        res = solve_spending_root(
+            retire_age=retire_age,
+            spend_min=spend_min,
+            spend_max=spend_max,
+            tolerance=tolerance,
+            engine=engine,
+            **sim_kwargs,
+        )
+        return res["max_spending"], res["total_enjoyment"], res["final_wealth"]
+    if method in ("vectorized", "kary"):
+        if method == "kary":
+            res = max_feasible_spending_kary(
+                retire_ages=retire_age,
+                spend_min=spend_min,
+                spend_max=spend_max,
+                step=step,
+                branching=branching,
+                engine=engine,
+                **sim_kwargs,
+            )
+        else:
+            res = max_feasible_spending_vectorized(
+                retire_ages=retire_age, spend_min=spend_min, spend_max=spend_max, step=step, **sim_kwargs
+            )
+        if np.isnan(res["best_monthly_spending"][0]):
+            return None, None, None
+        return int(res["best_monthly_spending"][0]), float(res["total_enjoyment"][0]), float(res["final_wealth"][0])
+    if method == "single_pass":
+        k_retire = retire_month_index(sim_kwargs["initial_age"], sim_kwargs["final_age"], retire_age)
+        row = max_feasible_spending_by_retire_month(
+            spend_min=spend_min, spend_max=spend_max, step=step, retire_months=[k_retire], **sim_kwargs
+        ).iloc[0]
+        if np.isnan(row["best_monthly_spending"]):
+            return None, None, None
+        return int(row["best_monthly_spending"]), float(row["total_enjoyment"]), float(row["final_wealth"])
+    if method not in ("bisect", "staircase"):  # a staircase over one age is a bisect
+        raise ValueError(f"Unknown search method {method!r}; expected one of {SEARCH_METHODS}")
+
     spend_range = range(spend_min, spend_max + step, step)
 
+    simulate = _spending_simulator(retire_age, engine, sim_kwargs)
+
     def is_not_feasible(y: int) -> bool:
-        res = simulate_with_retirement(retire_age=retire_age, monthly_spending=y, **sim_kwargs)
-        return res["final_wealth"] < 0
+        return simulate(y)["final_wealth"] < 0
 
     idx_first_infeas = bisect.bisect_left(spend_range, True, key=is_not_feasible)
 
@@ -123,43 +1267,365 @@ def max_feasible_spending_for_retire_age(
 
     best_s = spend_range.start + best_s_index * spend_range.step
 
-    best_res = simulate_with_retirement(
-        retire_age=retire_age, monthly_spending=best_s, **sim_kwargs
-    )
+    best_res = simulate(best_s)
     return best_s, best_res["total_enjoyment"], best_res["final_wealth"]
 
 
+@cacheable(ENGINE_VERSION)
+def optimize_retire_age(
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    age_min: Optional[float] = None,
+    age_max: Optional[float] = None,
+    neighborhood_months: int = 6,
+    coarse_months: int = MONTHS_PER_YEAR,
+    engine: str = "loop",
+    method: str = "bisect",
+    tolerance: float = 1.0,
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> Dict[str, object]:
+    """
+    Enjoyment-maximizing retirement month in [age_min, age_max] (default: the whole
+    horizon), where each month is scored by the total enjoyment at its maximum feasible
+    spending (max_feasible_spending_for_retire_age with `engine`, `method`, `tolerance`).
+
+    The enjoyment curve normally rises to a single peak and falls, so it is searched with
+    golden-section search over retirement months (O(log months) searches instead of one
+    per month), finishing with a scan of the last few months. The result is checked for
+    unimodality: every evaluated month must be non-decreasing in enjoyment up to the
+    optimum and non-increasing after it, the `neighborhood_months` around the optimum
+    included, and a probe pair that is infeasible on both sides (no direction) also fails
+    the check. If the check fails the optimum is found by a coarse scan every
+    `coarse_months` months followed by a monthly scan around the best coarse month.
+
+    Returns a dict with keys: retire_month, retire_age, best_monthly_spending,
+    total_enjoyment, final_wealth (None if no month has a feasible spending), search
+    ("golden" or "scan"), evaluations (number of spending searches), neighborhood
+    (DataFrame with retire_month, retire_age, best_monthly_spending, total_enjoyment,
+    final_wealth for the months around the optimum).
+    """
+    initial_age, final_age = sim_kwargs["initial_age"], sim_kwargs["final_age"]
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    ages = age_schedule(initial_age, months)
+    k_low = 0 if age_min is None else retire_month_index(initial_age, final_age, age_min)
+    k_high = months if age_max is None else retire_month_index(initial_age, final_age, age_max)
+
+    rows = {}
+
+    def enjoyment(k: int) -> float:
+        if k not in rows:
+            best_s, enjoy, final_w = max_feasible_spending_for_retire_age(
+                retire_age=ages[k],
+                spend_min=spend_min,
+                spend_max=spend_max,
+                step=step,
+                engine=engine,
+                method=method,
+                tolerance=tolerance,
+                **sim_kwargs,
+            )
+            rows[k] = {
+                "retire_month": k,
+                "retire_age": ages[k],
+                "best_monthly_spending": best_s,
+                "total_enjoyment": enjoy,
+                "final_wealth": final_w,
+            }
+        enjoy = rows[k]["total_enjoyment"]
+        return -math.inf if enjoy is None or math.isnan(enjoy) else enjoy
+
+    def is_unimodal(k_best: int) -> bool:
+        evaluated = sorted(rows)
+        values = [enjoyment(k) for k in evaluated]
+        peak = evaluated.index(k_best)
+        rising = all(v0 <= v1 for v0, v1 in zip(values[:peak], values[1 : peak + 1]))
+        falling = all(v0 >= v1 for v0, v1 in zip(values[peak:], values[peak + 1 :]))
+        return rising and falling
+
+    # golden-section search with symmetric probes c + d = a + b, so one probe is reused
+    a, b = k_low, k_high
+    c = a + round((b - a) * (2 - (1 + math.sqrt(5)) / 2))
+    d = a + b - c
+    ambiguous = False
+    while a < c < d < b:
+        f_c, f_d = enjoyment(c), enjoyment(d)
+        if f_c == f_d == -math.inf:
+            ambiguous = True
+            break
+        if f_c < f_d:
+            a, c = c, d
+            d = a + b - c
+        else:
+            b, d = d, c
+            c = a + b - d
+        if c > d:
+            c, d = d, c
+    for k in range(a, b + 1):
+        enjoyment(k)
+    k_best = max(rows, key=enjoyment)
+    for k in range(max(k_low, k_best - neighborhood_months), min(k_high, k_best + neighborhood_months) + 1):
+        enjoyment(k)
+    k_best = max(rows, key=enjoyment)
+    search = "golden"
+
+    if ambiguous or not is_unimodal(k_best):
+        search = "scan"
+        for k in list(range(k_low, k_high + 1, coarse_months)) + [k_high]:
+            enjoyment(k)
+        k_coarse = max(rows, key=enjoyment)
+        for k in range(max(k_low, k_coarse - coarse_months), min(k_high, k_coarse + coarse_months) + 1):
+            enjoyment(k)
+        k_best = max(rows, key=enjoyment)
+        for k in range(max(k_low, k_best - neighborhood_months), min(k_high, k_best + neighborhood_months) + 1):
+            enjoyment(k)
+
+    neighborhood = pd.DataFrame(
+        [rows[k] for k in range(max(k_low, k_best - neighborhood_months), min(k_high, k_best + neighborhood_months) + 1)]
+    )
+    best = rows[k_best] if enjoyment(k_best) > -math.inf else dict.fromkeys(rows[k_best], None)
+    return {
+        "retire_month": best["retire_month"],
+        "retire_age": best["retire_age"],
+        "best_monthly_spending": best["best_monthly_spending"],
+        "total_enjoyment": best["total_enjoyment"],
+        "final_wealth": best["final_wealth"],
+        "search": search,
+        "evaluations": len(rows),
+        "neighborhood": neighborhood,
+    }
+
+
+def resolve_workers(n_workers: Optional[int]) -> int:
+    """
+    Number of worker processes: `n_workers`, or every CPU of the machine if None.
+    """
+    if n_workers is None:
+        return os.cpu_count() or 1
+    if n_workers < 1:
+        raise ValueError("n_workers must be at least 1")
+    return n_workers
+
+
+def parallel_map(
+    func: Callable,
+    items: list,
+    n_workers: Optional[int] = 1,
+    batch_size: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> list:
+    """
+    [func(item) for item in items], optionally spread over a process pool.
+
+    With n_workers=1 (and no `executor`) this is a plain serial loop. Otherwise items are
+    sent to the pool in batches of `batch_size` (default: about four batches per worker,
+    to amortize pickling while keeping the load balanced) on `executor`, or on a pool of
+    resolve_workers(n_workers) processes created for the call. Results are returned in
+    the order of `items` whatever order they finish in. `func` and the items must be
+    picklable, i.e. module-level functions (or functools.partial of them) and plain data.
+    """
+    items = list(items)
+    if executor is None and (resolve_workers(n_workers) == 1 or len(items) <= 1):
+        return [func(item) for item in items]
+    n_workers = resolve_workers(n_workers)
+    if batch_size is None:
+        batch_size = max(1, -(-len(items) // (4 * n_workers)))
+    if executor is not None:
+        return list(executor.map(func, items, chunksize=batch_size))
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(items))) as pool:
+        return list(pool.map(func, items, chunksize=batch_size))
+
+
+def _grid_age_row(
+    task: Tuple[float, dict],
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    engine: str,
+    method: str,
+    tolerance: float = 1.0,
+) -> Dict[str, Optional[float]]:
+    """
+    One row of run_grid_ages: the search for task = (retire_age, sim_kwargs).
+    """
+    age, sim_kwargs = task
+    if method == "root":
+        res = solve_spending_root(
+            retire_age=age, spend_min=spend_min, spend_max=spend_max, tolerance=tolerance, engine=engine, **sim_kwargs
+        )
+        return {
+            "retire_age": age,
+            "best_monthly_spending": res["max_spending"],
+            "total_enjoyment": res["total_enjoyment"],
+            "final_wealth": res["final_wealth"],
+            "iterations": res["iterations"],
+        }
+    best_s, enjoy, final_w = max_feasible_spending_for_retire_age(
+        retire_age=age,
+        spend_min=spend_min,
+        spend_max=spend_max,
+        step=step,
+        engine=engine,
+        method=method,
+        **sim_kwargs,
+    )
+    return {
+        "retire_age": age,
+        "best_monthly_spending": best_s,
+        "total_enjoyment": enjoy,
+        "final_wealth": final_w,
+    }
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers", "batch_size"))
 def run_grid_ages(
     ages: list,
     spend_min: int,
     spend_max: int,
     step: int,
     sim_kwargs: dict,
+    engine: str = "loop",
+    method: str = "bisect",
+    n_workers: Optional[int] = 1,
+    batch_size: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    tolerance: float = 1.0,
 ) -> pd.DataFrame:
     """
     Run max_feasible_spending_for_retire_age for multiple ages and return a DataFrame.
+
+    With method="vectorized" all ages and the whole spending grid are evaluated in one
+    call of max_feasible_spending_vectorized instead of one search per age; with
+    method="single_pass" all ages are read off one max_feasible_spending_by_retire_month
+    sweep; with method="kary" all ages are searched in lockstep by
+    max_feasible_spending_kary, one batched call per round; with method="staircase" the
+    ages are searched in one warm-started pass of max_feasible_spending_staircase (serial,
+    as each age starts from the previous one).
+    method="root" solves for the continuous optimum of each age to `tolerance` dollars
+    (solve_spending_root, the grid step is unused) and adds an `iterations` column.
+    The per-age methods can spread the ages over `n_workers` processes (None: all
+    CPUs) in batches of `batch_size`, see parallel_map; rows are sorted by retire_age
+    either way, so the result does not depend on the worker count.
+
+    With a `cache` (result_cache.ResultCache) the table is served from disk when the same
+    parameters were run before (see result_cache.cacheable).
     """
+    if method in ("vectorized", "kary"):
+        if method == "kary":
+            res = max_feasible_spending_kary(
+                retire_ages=ages, spend_min=spend_min, spend_max=spend_max, step=step, engine=engine, **sim_kwargs
+            )
+        else:
+            res = max_feasible_spending_vectorized(
+                retire_ages=ages, spend_min=spend_min, spend_max=spend_max, step=step, **sim_kwargs
+            )
+        df = pd.DataFrame({"retire_age": ages, **res})
+        return df.sort_values("retire_age").reset_index(drop=True)
+    if method == "single_pass":
+        k_retire = [retire_month_index(sim_kwargs["initial_age"], sim_kwargs["final_age"], age) for age in ages]
+        by_month = max_feasible_spending_by_retire_month(
+            spend_min=spend_min, spend_max=spend_max, step=step, retire_months=k_retire, **sim_kwargs
+        )
+        df = pd.DataFrame(
+            {
+                "retire_age": ages,
+                "best_monthly_spending": by_month["best_monthly_spending"].to_numpy(),
+                "total_enjoyment": by_month["total_enjoyment"].to_numpy(),
+                "final_wealth": by_month["final_wealth"].to_numpy(),
+            }
+        )
+        return df.sort_values("retire_age").reset_index(drop=True)
+    if method == "staircase":
+        return max_feasible_spending_staircase(
+            ages=ages, spend_min=spend_min, spend_max=spend_max, step=step, engine=engine, **sim_kwargs
+        )
 
-    rows = []
-    for age in ages:
-        best_s, enjoy, final_w = max_feasible_spending_for_retire_age(
-            retire_age=age,
+    rows = parallel_map(
+        partial(
+            _grid_age_row,
             spend_min=spend_min,
             spend_max=spend_max,
             step=step,
-            **sim_kwargs,
+            engine=engine,
+            method=method,
+            tolerance=tolerance,
+        ),
+        [(age, sim_kwargs) for age in ages],
+        n_workers=n_workers,
+        batch_size=batch_size,
+    )
+
+    df = pd.DataFrame(rows).sort_values("retire_age", kind="stable").reset_index(drop=True)
+    return df
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers", "batch_size"))
+def run_scenarios(
+    scenarios: list,
+    ages: list,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    engine: str = "loop",
+    method: str = "bisect",
+    n_workers: Optional[int] = 1,
+    batch_size: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    tolerance: float = 1.0,
+) -> pd.DataFrame:
+    """
+    run_grid_ages for several parameter sets (`scenarios`, a list of sim_kwargs dicts).
+
+    For the per-age methods every (scenario, age) search is a separate task, so a pool
+    of `n_workers` processes stays busy even with few scenarios; the whole-sweep methods
+    run one task per scenario. Returns the run_grid_ages tables stacked with a leading
+    `scenario` column (the index in `scenarios`), sorted by scenario then retire_age.
+    `cache` serves repeated runs from disk and `tolerance` applies to method="root", as in
+    run_grid_ages.
+    """
+    if method in ("vectorized", "single_pass", "staircase", "kary"):
+        tables = parallel_map(
+            partial(
+                _scenario_grid,
+                ages=ages,
+                spend_min=spend_min,
+                spend_max=spend_max,
+                step=step,
+                engine=engine,
+                method=method,
+            ),
+            scenarios,
+            n_workers=n_workers,
+            batch_size=batch_size,
         )
-        rows.append(
-            {
-                "retire_age": age,
-                "best_monthly_spending": best_s,
-                "total_enjoyment": enjoy,
-                "final_wealth": final_w,
-            }
+        frames = [table.assign(scenario=i) for i, table in enumerate(tables)]
+    else:
+        rows = parallel_map(
+            partial(
+                _grid_age_row,
+                spend_min=spend_min,
+                spend_max=spend_max,
+                step=step,
+                engine=engine,
+                method=method,
+                tolerance=tolerance,
+            ),
+            [(age, sim_kwargs) for sim_kwargs in scenarios for age in ages],
+            n_workers=n_workers,
+            batch_size=batch_size,
         )
+        frames = [
+            pd.DataFrame(rows[i * len(ages) : (i + 1) * len(ages)]).assign(scenario=i) for i in range(len(scenarios))
+        ]
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df[["scenario"] + [c for c in df.columns if c != "scenario"]]
+    return df.sort_values(["scenario", "retire_age"], kind="stable").reset_index(drop=True)
 
-    df = pd.DataFrame(rows).sort_values("retire_age").reset_index(drop=True)
-    return df
+
+def _scenario_grid(sim_kwargs: dict, **grid_kwargs) -> pd.DataFrame:
+    return run_grid_ages(sim_kwargs=sim_kwargs, **grid_kwargs)
 
 
 if __name__ == "__main__":
@@ -185,21 +1651,68 @@ if __name__ == "__main__":
         "utility_multiplier_post_retire": config["utility_multiplier_post_retire"],
     }
 
-    df = run_grid_ages(
-        ages=ages,
-        spend_min=config["monthly_spending_min"],
-        spend_max=config["monthly_spending_max"],
-        step=config["monthly_spending_step"],
-        sim_kwargs=sim_kwargs
-    )
+    cache = ResultCache(config["cache_dir"], config.get("cache_max_mb")) if config.get("cache_dir") else None
+    if config.get("optimize_retire_age"):
+        # only the best retirement month and its neighborhood instead of the full age grid
+        best = optimize_retire_age(
+            spend_min=config["monthly_spending_min"],
+            spend_max=config["monthly_spending_max"],
+            step=config["monthly_spending_step"],
+            engine=config.get("engine", "loop"),
+            method=config.get("search_method", "bisect"),
+            tolerance=config.get("root_tolerance", 1.0),
+            cache=cache,
+            **sim_kwargs,
+        )
+        if best["retire_age"] is None:
+            print(f"No retirement age has a feasible spending ({best['evaluations']} evaluations)")
+        else:
+            print(
+                f"Best retirement age {best['retire_age']:.2f} (month {best['retire_month']}) found by "
+                f"{best['search']} search in {best['evaluations']} evaluations:"
+            )
+            pd.set_option("display.float_format", lambda x: f"{x:,.2f}" if pd.notnull(x) else "None")
+            print(best["neighborhood"].to_string(index=False))
+    else:
+        df = run_grid_ages(
+            ages=ages,
+            spend_min=config["monthly_spending_min"],
+            spend_max=config["monthly_spending_max"],
+            step=config["monthly_spending_step"],
+            sim_kwargs=sim_kwargs,
+            engine=config.get("engine", "loop"),
+            method=config.get("search_method", "bisect"),
+            tolerance=config.get("root_tolerance", 1.0),
+            n_workers=config.get("n_workers", 1),
+            cache=cache,
+        )
 
-    # Normalize total_enjoyment to max 100, as integers
-    if not df.empty and df['total_enjoyment'].notna().any():
-        max_enjoy = df['total_enjoyment'].max()
-        df['total_enjoyment'] = (df['total_enjoyment'] / max_enjoy * 100).round().astype(int)
+        # Normalize total_enjoyment to max 100, as integers
+        if not df.empty and df['total_enjoyment'].notna().any():
+            max_enjoy = df['total_enjoyment'].max()
+            df['total_enjoyment'] = (df['total_enjoyment'] / max_enjoy * 100).round().astype(int)
 
-    # print nicely
-    pd.set_option(
-        "display.float_format", lambda x: f"{x:,.2f}" if pd.notnull(x) else "None"
-    )
-    print(df.to_string(index=False))
+        # print nicely
+        pd.set_option(
+            "display.float_format", lambda x: f"{x:,.2f}" if pd.notnull(x) else "None"
+        )
+        print(df.to_string(index=False))
+
+    # Best retirement age for each utility exponent in the optional sweep
+    if config.get("utility_exponent_sweep"):
+        sweep = utility_exponent_sweep(
+            ages=ages,
+            exponents_pre=config["utility_exponent_sweep"],
+            spend_min=config["monthly_spending_min"],
+            spend_max=config["monthly_spending_max"],
+            step=config["monthly_spending_step"],
+            exponents_post=config.get("utility_exponent_sweep_post"),
+            **sim_kwargs,
+        )
+        best = sweep.loc[
+            sweep.dropna(subset=["total_enjoyment"])
+            .groupby(["utility_exponent_pre_retire", "utility_exponent_post_retire"])["total_enjoyment"]
+            .idxmax()
+        ]
+        print("\nBest retirement age by utility exponent:")
+        print(best.to_string(index=False))
@@ -0,0 +1,2182 @@
+"""
+Retirement Monte Carlo Simulator
+
+Stochastic counterpart of retirement_enjoyment_simulator.py: the deterministic
+`investment_annual_growth` is replaced by lognormal monthly returns and many return
+paths are stepped through the same monthly model at once with NumPy.
+
+How the code is organized:
+- generate_standard_normals(...) / generate_monthly_returns(...) -> (months, n_paths)
+  matrix of gross monthly returns with annual expected return `mu` and annual log-return
+  volatility `sigma`; shocks are plain pseudo-random, antithetic pairs or scrambled Sobol
+  points.
+- income_schedule(...) / policy_schedule(...) -> per-month income and utility of a
+  (retire_age, spending) policy.
+- simulate_paths(...) -> steps every path of a policy through the horizon and returns
+  per-path final wealth and enjoyment.
+- spending_thresholds(...) -> per-path maximum sustainable spending (final wealth is
+  affine in spending on every path).
+- tilt_window(...) / tilt_shocks(...) / select_tilt(...) -> importance sampling:
+  exponentially tilted shocks in the first retirement decade, likelihood-ratio weights
+  and a cross-entropy pilot run that picks the tilt.
+- chunk_size_for_budget(...) / iter_return_chunks(...) -> paths are generated and
+  processed in fixed-size chunks so peak memory is bounded by a memory budget; each
+  chunk draws from its own SeedSequence child keyed by chunk index (chunk_rng), so any
+  chunk can be regenerated independently and results do not depend on worker count.
+- PolicyStatistics -> mergeable online accumulator of a policy's ruin count, terminal
+  wealth and enjoyment (see online_statistics.py), with the ruin-probability standard
+  error, optional control-variate correction and effective sample size.
+- validate_float32(...) -> checks that the float32 path precision (dtype="float32")
+  leaves the ruin probabilities of a reference configuration unchanged.
+- validate_deterministic_limit(...) -> checks that with sigma=0 the Monte Carlo
+  enjoyment and final wealth of policies match simulate_with_retirement.
+- simulate_monte_carlo(...) -> ruin probability, terminal-wealth quantiles and enjoyment
+  statistics for a (retire_age, spending) policy; optionally adds chunks of paths until
+  the confidence interval on P(ruin) is tight enough (see ruin_interval_half_width).
+- max_ruin_constrained_spending_for_retire_age(...) -> largest grid spending with
+  P(ruin) <= p*, read off the per-path thresholds, plus the P(ruin)-vs-spending curve.
+- ruin_constrained_spending_root(...) -> largest continuous spending with P(ruin) <= p*, solved
+  with find_root on common random numbers (no affine shortcut needed).
+- HistoricalReturns (historical_returns.py) -> optional `return_source` that
+  block-bootstraps returns from a memory-mapped history instead of the lognormal model.
+- backtest_ages(...) -> rolling historical backtest: every retire age run from every
+  historical start month (HistoricalReturns.rolling_windows).
+- simulate_policies(...) -> summaries of many policies on common return paths; with a
+  process pool the return chunk and schedules live in shared memory (shared_arrays.py).
+- common_spending_thresholds(...) / run_grid_ages_monte_carlo(...) /
+  ruin_probability_surface(...) -> run_grid_ages-style sweeps where every
+  (retire_age, spending) policy is evaluated on the same return paths (common random
+  numbers), generated once per sweep.
+- optimize_ruin_constrained_policy(...) -> best (retire_age, spending) under
+  P(ruin) <= p* at monthly resolution (coarse pass, refinement around the optimum, on
+  common random numbers) and the Pareto frontier of enjoyment vs ruin.
+- main block runs the ruin-constrained search for each retirement age as defined in
+  config.json and prints a table next to the deterministic max feasible spending (or,
+  with optimize_retire_age, only the optimal policy and the frontier).
+
+Ruin follows the deterministic model's `bankrupt` flag: a path is ruined when its final
+wealth is negative. Enjoyment accrues every month as in simulate_with_retirement, so
+with sigma=0 a policy's enjoyment and final wealth match the deterministic model
+(validate_deterministic_limit).
+"""
+
+import json
+import math
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from statistics import NormalDist
+from typing import Callable, Optional, Tuple, Dict, Iterator, List, Union
+
+from historical_returns import HistoricalReturns
+from online_statistics import OnlineCovariance, OnlineMoments, QuantileSketch
+from shared_arrays import SharedArray, SharedArraySpec
+from result_cache import ResultCache, cacheable
+from retirement_enjoyment_simulator import (
+    ENGINE_VERSION,
+    MONTHS_PER_YEAR,
+    age_schedule,
+    find_root,
+    parallel_map,
+    resolve_workers,
+    retire_month_index,
+    run_grid_ages,
+    simulate_with_retirement,
+    _utility,
+)
+
+try:
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+except ImportError:  # scipy is only needed for sampling="sobol"
+    ndtri = None
+    qmc = None
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_MEMORY_BUDGET_MB = 256.0
+SAMPLING_METHODS = ("pseudo_random", "antithetic", "sobol")
+DTYPES = ("float64", "float32")
+
+
+def monthly_lognormal_params(mu: float, sigma: float) -> Tuple[float, float]:
+    """
+    Mean and standard deviation of the monthly log-return such that the expected gross
+    monthly return is (1 + mu) ** (1 / 12), i.e. the deterministic model's 1 + beta_m, and
+    the annual log-return volatility is sigma.
+    """
+    sigma_m = sigma / math.sqrt(MONTHS_PER_YEAR)
+    mu_m = math.log1p(mu) / MONTHS_PER_YEAR - 0.5 * sigma_m**2
+    return mu_m, sigma_m
+
+
+def generate_standard_normals(
+    rng: np.random.Generator,
+    months: int,
+    n_paths: int,
+    sampling: str = "pseudo_random",
+    dtype: str = "float64",
+) -> np.ndarray:
+    """
+    Draw a (months, n_paths) matrix of standard normal return shocks of type `dtype`.
+
+    sampling="pseudo_random" draws independent normals; "antithetic" draws n_paths / 2
+    paths and appends their negations (path i is paired with path i + n_paths / 2, so
+    n_paths must be even); "sobol" maps one scrambled Sobol point set (one dimension per
+    month, scrambled with `rng`) through the inverse normal CDF and needs scipy.
+    """
+    if sampling == "pseudo_random":
+        return rng.standard_normal((months, n_paths), dtype=dtype)
+    if sampling == "antithetic":
+        if n_paths % 2:
+            raise ValueError("antithetic sampling needs an even number of paths")
+        half = n_paths // 2
+        shocks = np.empty((months, n_paths), dtype=dtype)
+        shocks[:, :half] = rng.standard_normal((months, half), dtype=dtype)
+        np.negative(shocks[:, :half], out=shocks[:, half:])
+        return shocks
+    if sampling == "sobol":
+        if qmc is None:
+            raise ImportError("sampling='sobol' requires scipy")
+        sampler = qmc.Sobol(d=months, scramble=True, seed=rng)
+        if n_paths & (n_paths - 1) == 0:
+            points = sampler.random_base2(int(math.log2(n_paths)))
+        else:
+            points = sampler.random(n_paths)
+        # in place, then one transposed copy: the float64 point set and the shocks are
+        # the only chunk-sized arrays (resolve_chunking budgets for both)
+        ndtri(points, out=points)
+        shocks = np.empty((months, n_paths), dtype=dtype)
+        shocks[...] = points.T
+        return shocks
+    raise ValueError(f"Unknown sampling method {sampling!r}; expected one of {SAMPLING_METHODS}")
+
+
+def generate_monthly_returns(
+    rng: np.random.Generator,
+    months: int,
+    n_paths: int,
+    mu: float,
+    sigma: float,
+    sampling: str = "pseudo_random",
+    dtype: str = "float64",
+) -> np.ndarray:
+    """
+    Draw a (months, n_paths) matrix of gross monthly returns exp(N(mu_m, sigma_m)), with
+    shocks from generate_standard_normals.
+
+    Months are the leading axis so that stepping all paths through one month reads a
+    contiguous row.
+    """
+    return shocks_to_returns(generate_standard_normals(rng, months, n_paths, sampling, dtype), mu, sigma)
+
+
+def shocks_to_returns(shocks: np.ndarray, mu: float, sigma: float) -> np.ndarray:
+    """
+    Turn standard normal shocks into gross monthly returns exp(mu_m + sigma_m * z), in place.
+    """
+    mu_m, sigma_m = monthly_lognormal_params(mu, sigma)
+    shocks *= sigma_m
+    shocks += mu_m
+    np.exp(shocks, out=shocks)
+    return shocks
+
+
+def tilt_window(retire_age: float, tilt_window_years: float, initial_age: float, final_age: float, **unused_kwargs) -> slice:
+    """
+    Months whose shocks are tilted by importance sampling: the first `tilt_window_years`
+    of retirement, when sequence-of-returns risk drives ruin.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    k_retire = retire_month_index(initial_age, final_age, retire_age)
+    return slice(k_retire, min(months, k_retire + int(round(tilt_window_years * MONTHS_PER_YEAR))))
+
+
+def tilt_shocks(shocks: np.ndarray, tilt: float, window: slice) -> np.ndarray:
+    """
+    Exponentially tilt the shocks of the `window` months towards poor returns, in place:
+    z ~ N(0, 1) becomes z - tilt ~ N(-tilt, 1).
+
+    Returns the per-path likelihood ratios exp(tilt * sum(z_tilted) + m * tilt^2 / 2) of the
+    original over the tilted distribution (m = months in the window), so that
+    mean(weight * f(path)) is an unbiased estimate of E[f] under the untilted model.
+    """
+    shocks[window] -= tilt
+    n_months = shocks[window].shape[0]
+    return np.exp(tilt * shocks[window].sum(axis=0) + 0.5 * n_months * tilt**2)
+
+
+def chunk_size_for_budget(months: int, memory_budget_mb: float, itemsize: int = 8) -> int:
+    """
+    Number of paths per chunk such that one (months, chunk) return matrix fits in
+    memory_budget_mb. The per-path state vectors are negligible next to it.
+    """
+    return max(1, int(memory_budget_mb * 2**20) // (months * itemsize))
+
+
+def resolve_chunking(
+    months: int,
+    n_paths: int,
+    chunk_size: Optional[int],
+    memory_budget_mb: float,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    dtype: str = "float64",
+) -> Tuple[int, int]:
+    """
+    Final (n_paths, chunk_size) for a run.
+
+    The chunk size defaults to chunk_size_for_budget for returns of type `dtype` (float32
+    chunks hold twice as many paths); Sobol chunks also budget for the float64 point set
+    that generate_standard_normals holds next to the shocks. Antithetic sampling needs
+    even chunks (n_paths is rounded up to even). Sobol sampling uses at least
+    `qmc_replicates` independently scrambled chunks, each a power-of-two point set, and
+    rounds n_paths up to a whole number of chunks; the spread between chunks gives its
+    standard error.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}; expected one of {DTYPES}")
+    if chunk_size is None:
+        itemsize = np.dtype(dtype).itemsize
+        if sampling == "sobol":
+            itemsize += np.dtype(np.float64).itemsize
+        chunk_size = chunk_size_for_budget(months, memory_budget_mb, itemsize)
+    if sampling == "antithetic":
+        chunk_size = max(2, chunk_size - chunk_size % 2)
+        n_paths += n_paths % 2
+    elif sampling == "sobol":
+        chunk_size = min(chunk_size, max(1, n_paths // qmc_replicates))
+        chunk_size = 2 ** int(math.log2(chunk_size))
+        n_paths = -(-n_paths // chunk_size) * chunk_size
+    return n_paths, chunk_size
+
+
+def resolve_seed(seed: Optional[int]) -> int:
+    """
+    Return `seed`, or fresh OS entropy if it is None, so a run can replay its own paths.
+    """
+    return seed if seed is not None else int(np.random.SeedSequence().entropy)
+
+
+def check_return_source(
+    return_source: Optional[HistoricalReturns],
+    sampling: str = "pseudo_random",
+    control_variate: bool = False,
+    importance_sampling: bool = False,
+) -> None:
+    """
+    Reject options that rely on the lognormal model when returns come from a historical
+    bootstrap: antithetic / Sobol shocks, importance-sampling tilts and the control
+    variate (whose expectation is only known in closed form for independent returns).
+    """
+    if return_source is None:
+        return
+    if sampling != "pseudo_random":
+        raise ValueError(f"sampling={sampling!r} is not available with a historical return source")
+    if control_variate or importance_sampling:
+        raise ValueError("control_variate and importance_sampling need lognormal returns, not a return source")
+
+
+def chunk_rng(seed: int, chunk_index: int) -> np.random.Generator:
+    """
+    Generator of chunk `chunk_index` of a run: the child SeedSequence(seed).spawn(...)
+    would hand out at that index, built directly from its spawn key. Any process can
+    regenerate any chunk on its own, so results do not depend on how chunks are shared
+    out between workers. Drawing return shocks dominates the cost of a policy, so the
+    stream uses SFC64, NumPy's fastest bit generator (about 20% faster normals than the
+    default PCG64).
+    """
+    return np.random.Generator(np.random.SFC64(np.random.SeedSequence(seed, spawn_key=(chunk_index,))))
+
+
+def return_chunk(
+    seed: int,
+    chunk_index: int,
+    months: int,
+    n_paths: int,
+    chunk_size: int,
+    mu: float,
+    sigma: float,
+    sampling: str = "pseudo_random",
+    tilt: Optional[Tuple[float, slice]] = None,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    (returns, weights) of chunk `chunk_index` of an n_paths run: paths
+    [chunk_index * chunk_size, min((chunk_index + 1) * chunk_size, n_paths)), drawn from
+    chunk_rng(seed, chunk_index). See iter_return_chunks.
+
+    With a `return_source` (HistoricalReturns) the returns are block-bootstrapped from its
+    history instead of lognormal with `mu` / `sigma`. Returns are of type `dtype`.
+    """
+    start = chunk_index * chunk_size
+    width = min(chunk_size, n_paths - start)
+    if return_source is not None:
+        return return_source.sample(chunk_rng(seed, chunk_index), months, width, dtype), None
+    shocks = generate_standard_normals(chunk_rng(seed, chunk_index), months, width, sampling, dtype)
+    weights = tilt_shocks(shocks, *tilt) if tilt is not None else None
+    return shocks_to_returns(shocks, mu, sigma), weights
+
+
+def _returns_only(seed: int, chunk_index: int, **chunk_kwargs) -> np.ndarray:
+    """
+    Returns matrix of return_chunk(seed, chunk_index, **chunk_kwargs), without weights.
+    """
+    returns, _ = return_chunk(seed, chunk_index, **chunk_kwargs)
+    return returns
+
+
+def iter_return_chunks(
+    seed: int,
+    months: int,
+    n_paths: int,
+    chunk_size: int,
+    mu: float,
+    sigma: float,
+    sampling: str = "pseudo_random",
+    tilt: Optional[Tuple[float, slice]] = None,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Yield (returns, weights) pairs of (months, chunk) return matrices covering n_paths
+    paths in order. `tilt` = (tilt, window) applies tilt_shocks and yields the
+    likelihood-ratio weights; weights is None otherwise. `return_source` replaces the
+    lognormal model by a historical bootstrap (see return_chunk).
+
+    Every chunk has its own random stream (chunk_rng), so the same (seed, n_paths,
+    chunk_size) always replays the same paths, whether the chunks are generated here in
+    order or by return_chunk in separate processes.
+    """
+    for chunk_index in range(-(-n_paths // chunk_size)):
+        yield return_chunk(
+            seed, chunk_index, months, n_paths, chunk_size, mu, sigma, sampling, tilt, return_source, dtype
+        )
+
+
+def iter_chunk_results(
+    func: Callable, n_chunks: int, n_workers: Optional[int] = 1, wave_size: Optional[int] = None
+) -> Iterator:
+    """
+    Yield func(chunk_index) for chunk_index = 0 .. n_chunks - 1, in that order.
+
+    With n_workers > 1 (None: all CPUs) the chunks are computed on a process pool,
+    `wave_size` chunks at a time (default: all of them), so a consumer that stops early
+    wastes at most one wave. Each worker holds its own chunk, so peak memory is about
+    n_workers times the chunk memory budget. `func` must be picklable (a module-level
+    function or functools.partial of one); it only depends on the chunk index, so the
+    results are the same for any worker count.
+    """
+    n_workers = resolve_workers(n_workers)
+    if n_workers == 1 or n_chunks <= 1:
+        for chunk_index in range(n_chunks):
+            yield func(chunk_index)
+        return
+    wave_size = wave_size or n_chunks
+    with ProcessPoolExecutor(max_workers=min(n_workers, n_chunks)) as pool:
+        for start in range(0, n_chunks, wave_size):
+            yield from parallel_map(func, range(start, min(start + wave_size, n_chunks)), executor=pool, batch_size=1)
+
+
+class PolicyStatistics:
+    """
+    Mergeable online summary of a policy's simulated paths: ruin count, terminal wealth
+    moments and quantile sketch, enjoyment moments.
+
+    The ruin-probability standard error is computed over independent units: single paths
+    for pseudo-random sampling, antithetic pairs, or whole chunks for Sobol sampling (each
+    chunk is an independent scramble). If `expected_final_wealth` is given, terminal
+    wealth is used as a control variate for the ruin indicator: its expectation is the
+    deterministic final wealth, so p_cv = p - c * (mean(W_T) - E[W_T]) with the
+    variance-minimizing c = Cov(ruin, W_T) / Var(W_T) estimated from the same units.
+
+    With importance-sampling `weights` the ruin probability is the unbiased mean of
+    weight * ruin, the control variate becomes weight * W_T (same expectation), and
+    wealth / enjoyment moments and quantiles are likelihood-ratio weighted.
+    """
+
+    def __init__(
+        self,
+        sampling: str = "pseudo_random",
+        expected_final_wealth: Optional[float] = None,
+        relative_accuracy: float = 0.01,
+    ):
+        self.sampling = sampling
+        self.expected_final_wealth = expected_final_wealth
+        self.ruin_count = 0
+        self.final_wealth = OnlineMoments()
+        self.final_wealth_sketch = QuantileSketch(relative_accuracy)
+        self.enjoyment = OnlineMoments()
+        self.ruin_units = OnlineCovariance()
+        self.n_paths = 0
+
+    def update(
+        self, final_wealth: np.ndarray, total_enjoyment: np.ndarray, weights: Optional[np.ndarray] = None
+    ) -> None:
+        ruined = final_wealth < 0
+        self.n_paths += len(final_wealth)
+        self.ruin_count += int(np.count_nonzero(ruined))
+        self.final_wealth.update(final_wealth, weights)
+        self.final_wealth_sketch.update(final_wealth, weights)
+        self.enjoyment.update(total_enjoyment, weights)
+
+        control = final_wealth
+        ruin = ruined.astype(float)
+        if weights is not None:
+            control = weights * final_wealth
+            ruin = weights * ruin
+        if self.sampling == "antithetic":
+            half = len(final_wealth) // 2
+            self.ruin_units.update((control[:half] + control[half:]) / 2, (ruin[:half] + ruin[half:]) / 2)
+        elif self.sampling == "sobol":
+            self.ruin_units.update([control.mean()], [ruin.mean()])
+        else:
+            self.ruin_units.update(control, ruin)
+
+    def merge(self, other: "PolicyStatistics") -> None:
+        self.n_paths += other.n_paths
+        self.ruin_count += other.ruin_count
+        self.final_wealth.merge(other.final_wealth)
+        self.final_wealth_sketch.merge(other.final_wealth_sketch)
+        self.enjoyment.merge(other.enjoyment)
+        self.ruin_units.merge(other.ruin_units)
+
+    def ruin_estimate(self) -> Tuple[float, float]:
+        """
+        (ruin probability, its standard error), control-variate corrected if configured.
+        """
+        units = self.ruin_units
+        n_units = units.count
+        p = units.mean_y
+        variance = units.variance_y
+        if self.expected_final_wealth is not None and units.variance_x > 0:
+            c = units.covariance / units.variance_x
+            p = units.mean_y - c * (units.mean_x - self.expected_final_wealth)
+            variance = units.variance_y - c * units.covariance
+        if n_units < 2:
+            return min(max(p, 0.0), 1.0), math.nan
+        stderr = math.sqrt(max(variance, 0.0) / (n_units - 1))
+        return min(max(p, 0.0), 1.0), stderr
+
+    def summary(self, quantiles: Tuple[float, ...] = DEFAULT_QUANTILES) -> Dict[str, object]:
+        """
+        Result dict of the run. effective_sample_size is the number of plain Monte Carlo
+        paths whose binomial standard error p (1 - p) / n would match this estimator's.
+        """
+        n_paths = self.n_paths
+        p, stderr = self.ruin_estimate()
+        if stderr > 0 and 0 < p < 1:
+            effective_sample_size = p * (1 - p) / stderr**2
+        else:
+            effective_sample_size = math.nan
+        return {
+            "ruin_probability": p,
+            "ruin_probability_stderr": stderr,
+            "effective_sample_size": effective_sample_size,
+            "final_wealth_mean": self.final_wealth.mean,
+            "final_wealth_quantiles": {q: self.final_wealth_sketch.quantile(q) for q in quantiles},
+            "enjoyment_mean": self.enjoyment.mean,
+            "enjoyment_std": self.enjoyment.std,
+            "n_paths": n_paths,
+        }
+
+
+def income_schedule(
+    retire_age: float,
+    initial_age: float,
+    final_age: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retired_monthly_income: float,
+    **unused_kwargs,
+) -> np.ndarray:
+    """
+    Income received in each simulated month: salary growing at income_annual_growth
+    while working, retired_monthly_income afterwards.
+
+    Other model parameters are accepted (and ignored) so the usual sim_kwargs can be passed.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    alpha_m = (1 + income_annual_growth) ** (1 / MONTHS_PER_YEAR) - 1
+    k_retire = retire_month_index(initial_age, final_age, retire_age)
+
+    income = np.full(months, float(retired_monthly_income))
+    income[:k_retire] = initial_monthly_income * (1 + alpha_m) ** np.arange(k_retire)
+    return income
+
+
+def policy_schedule(
+    retire_age: float,
+    monthly_spending: float,
+    initial_age: float,
+    final_age: float,
+    initial_monthly_income: float,
+    income_annual_growth: float,
+    retired_monthly_income: float,
+    utility_exponent_pre_retire: float,
+    utility_exponent_post_retire: Optional[float],
+    utility_multiplier_post_retire: float,
+    initial_wealth: Optional[float] = None,
+    investment_annual_growth: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Per-month cash flows and utilities of a (retire_age, spending) policy, laid out the way
+    simulate_with_retirement steps through them. `monthly_spending` may be an array; the
+    utility schedule then has shape (months,) + its shape.
+
+    initial_wealth and investment_annual_growth are accepted so the usual sim_kwargs can
+    be passed; they do not enter the schedule.
+
+    Returns a dict with keys: income (months,), month_utility, spending.
+    """
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    k_retire = retire_month_index(initial_age, final_age, retire_age)
+
+    ages = np.asarray(age_schedule(initial_age, months))
+    age_factor = np.maximum(0.0, 1.0 - (ages[:months] - initial_age) / (final_age - initial_age))
+
+    income = income_schedule(
+        retire_age=retire_age,
+        initial_age=initial_age,
+        final_age=final_age,
+        initial_monthly_income=initial_monthly_income,
+        income_annual_growth=income_annual_growth,
+        retired_monthly_income=retired_monthly_income,
+    )
+
+    gamma_post = utility_exponent_post_retire if utility_exponent_post_retire is not None else utility_exponent_pre_retire
+    spending = np.asarray(monthly_spending, dtype=float)
+    utility_pre = _utility(spending, utility_exponent_pre_retire)
+    utility_post = _utility(spending, gamma_post) * utility_multiplier_post_retire
+    working = (np.arange(months) < k_retire).reshape((months,) + (1,) * spending.ndim)
+    age_factor = age_factor.reshape(working.shape)
+    month_utility = np.where(working, utility_pre, utility_post) * age_factor
+
+    return {"income": income, "month_utility": month_utility, "spending": spending}
+
+
+def simulate_paths(
+    returns: np.ndarray,
+    schedule: Dict[str, np.ndarray],
+    initial_wealth: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Step every return path (columns of `returns`) through the monthly model of one policy.
+
+    Spending in `schedule` broadcasts against the path axis, so an (S, 1) spending array
+    evaluates S policies on the same paths.
+
+    Wealth is stepped in the dtype of `returns` (float32 halves the memory traffic of the
+    loop). As in simulate_with_retirement, every month's utility accrues whatever the
+    path's wealth, so total enjoyment is the same float64 sum on every path.
+
+    Returns a dict with per-path arrays final_wealth and total_enjoyment.
+    """
+    months, n_paths = returns.shape
+    spending = schedule["spending"]
+    shape = np.broadcast_shapes(spending.shape, (n_paths,))
+    W = np.full(shape, float(initial_wealth), dtype=returns.dtype)
+    total_enjoyment = np.broadcast_to(np.sum(schedule["month_utility"], axis=0, dtype=np.float64), shape)
+    # cast once: float64 operands would promote every float32 update back to float64
+    income = np.asarray(schedule["income"], dtype=returns.dtype)
+    spending = np.asarray(spending, dtype=returns.dtype)
+
+    for k in range(months):
+        W *= returns[k]
+        W += income[k]
+        W -= spending
+
+    return {"final_wealth": W, "total_enjoyment": total_enjoyment}
+
+
+def spending_thresholds(
+    returns: np.ndarray,
+    income: np.ndarray,
+    initial_wealth: float,
+) -> np.ndarray:
+    """
+    Per-path maximum sustainable monthly spending.
+
+    On a fixed return path final wealth is A - B * spending, with A the final wealth at
+    zero spending and B the compounded value of one dollar spent every month; both follow
+    the same recursion as the wealth update. A path is ruined exactly when spending
+    exceeds its threshold A / B.
+
+    `income` is a (months,) schedule, or (months, P) for P policies (e.g. retire ages)
+    evaluated on the same paths in one sweep; the result is then (P, n_paths). A and B are
+    stepped in the dtype of `returns`.
+    """
+    months, n_paths = returns.shape
+    income = np.asarray(income, dtype=returns.dtype)
+    if income.ndim == 2:
+        income = income[:, :, None]
+    A = np.full(income.shape[1:-1] + (n_paths,), float(initial_wealth), dtype=returns.dtype)
+    B = np.zeros(n_paths, dtype=returns.dtype)
+    for k in range(months):
+        A *= returns[k]
+        A += income[k]
+        B *= returns[k]
+        B += 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(B > 0, A / B, np.where(A >= 0, np.inf, -np.inf))
+
+
+def chunk_spending_thresholds(
+    seed: int,
+    chunk_index: int,
+    months: int,
+    n_paths: int,
+    chunk_size: int,
+    mu: float,
+    sigma: float,
+    income: np.ndarray,
+    initial_wealth: float,
+    sampling: str = "pseudo_random",
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+) -> np.ndarray:
+    """
+    spending_thresholds of one chunk of paths (see return_chunk), for a worker process.
+    """
+    returns, _ = return_chunk(
+        seed, chunk_index, months, n_paths, chunk_size, mu, sigma, sampling, return_source=return_source, dtype=dtype
+    )
+    return spending_thresholds(returns, income, initial_wealth)
+
+
+def max_spending_for_ruin_probability(thresholds: np.ndarray, ruin_probability_max: float) -> float:
+    """
+    Largest spending whose empirical ruin probability over the paths behind `thresholds`
+    is at most ruin_probability_max.
+
+    P(ruin)(s) is the fraction of thresholds below s, so the answer is the
+    floor(p* * n)-th smallest threshold, found with np.partition.
+    """
+    n_paths = len(thresholds)
+    m = int(math.floor(ruin_probability_max * n_paths))
+    if m >= n_paths:
+        return math.inf
+    return float(np.partition(thresholds, m)[m])
+
+
+def ruin_probability_curve(thresholds: np.ndarray, spendings: np.ndarray) -> np.ndarray:
+    """
+    Empirical P(ruin) at every spending level in `spendings`, from per-path thresholds.
+    """
+    sorted_thresholds = np.sort(thresholds)
+    return np.searchsorted(sorted_thresholds, spendings, side="left") / len(thresholds)
+
+
+def ruin_interval_half_width(p: float, stderr: float, n_paths: int, confidence: float) -> float:
+    """
+    Half-width of the normal-approximation confidence interval on P(ruin).
+
+    It is never narrower than -ln(1 - confidence) / n_paths, the exact one-sided bound
+    when no ruin has been observed yet ("rule of three" at 95%), so a run that has not
+    seen a ruin does not look infinitely precise.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    floor = -math.log(1 - confidence) / n_paths
+    if math.isnan(stderr):
+        return math.inf
+    return max(z * stderr, floor)
+
+
+def spending_interval_width(thresholds: np.ndarray, ruin_probability_max: float, confidence: float) -> float:
+    """
+    Width (in dollars) of the distribution-free confidence interval on the ruin-constrained
+    spending quantile, from the order statistics m -/+ z * sqrt(n p (1 - p)) around its
+    rank m = floor(p * n).
+    """
+    n_paths = len(thresholds)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    m = ruin_probability_max * n_paths
+    spread = z * math.sqrt(n_paths * ruin_probability_max * (1 - ruin_probability_max))
+    lo = max(0, int(math.floor(m - spread)))
+    hi = min(n_paths - 1, int(math.ceil(m + spread)))
+    bounds = np.partition(thresholds, (lo, hi))
+    return float(bounds[hi] - bounds[lo])
+
+
+def select_tilt(
+    retire_age: float,
+    monthly_spending: float,
+    sigma: float,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    pilot_paths: int = 2000,
+    tilt_window_years: float = 10.0,
+    iterations: int = 3,
+    **sim_kwargs,
+) -> float:
+    """
+    Pick the importance-sampling tilt for a policy from a short cross-entropy pilot run.
+
+    Each iteration simulates `pilot_paths` paths at the current tilt and moves the tilt to
+    the likelihood-weighted average shock of the tilted months on ruined paths, which is
+    the cross-entropy optimal mean shift. If no pilot path is ruined the tilt is increased
+    by 0.1 standard deviations and the iteration repeated.
+    """
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    window = tilt_window(retire_age, tilt_window_years, **sim_kwargs)
+    schedule = policy_schedule(retire_age=retire_age, monthly_spending=monthly_spending, **sim_kwargs)
+    rng = np.random.default_rng(seed)
+
+    tilt = 0.0
+    for _ in range(iterations):
+        shocks = rng.standard_normal((months, pilot_paths))
+        weights = tilt_shocks(shocks, tilt, window)
+        mean_tilted_shock = shocks[window].mean(axis=0)
+        returns = shocks_to_returns(shocks, mu, sigma)
+        ruined = simulate_paths(returns, schedule, sim_kwargs["initial_wealth"])["final_wealth"] < 0
+        if not ruined.any():
+            tilt += 0.1
+            continue
+        tilt = max(0.0, -float(weights[ruined] @ mean_tilted_shock[ruined]) / float(weights[ruined].sum()))
+    return tilt
+
+
+def policy_chunk_statistics(
+    seed: int,
+    chunk_index: int,
+    months: int,
+    n_paths: int,
+    chunk_size: int,
+    mu: float,
+    sigma: float,
+    schedule: Dict[str, np.ndarray],
+    initial_wealth: float,
+    sampling: str = "pseudo_random",
+    tilt: Optional[Tuple[float, slice]] = None,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+) -> PolicyStatistics:
+    """
+    PolicyStatistics of one chunk of a policy's paths (see return_chunk). Depends only on
+    its arguments, so chunks can be computed by any worker and merged afterwards; merging
+    in chunk_index order reproduces a sequential run bit for bit.
+    """
+    returns, weights = return_chunk(
+        seed, chunk_index, months, n_paths, chunk_size, mu, sigma, sampling, tilt, return_source, dtype
+    )
+    res = simulate_paths(returns, schedule, initial_wealth)
+    stats = PolicyStatistics(sampling)
+    stats.update(res["final_wealth"], res["total_enjoyment"], weights)
+    return stats
+
+
+@cacheable(ENGINE_VERSION)
+def backtest_ages(
+    ages: list,
+    monthly_spendings: Union[float, list],
+    return_source: HistoricalReturns,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Rolling historical backtest: run each (ages[i], monthly_spendings[i]) plan (a scalar
+    spending applies to every age) starting from every historical month with a full
+    horizon of history after it.
+
+    The windows are the columns of return_source.rolling_windows, a strided view of the
+    memory-mapped history, so every start month is simulated without copying returns.
+    Overlapping windows are not independent samples; success rates describe history,
+    not probabilities. `cache` serves repeated backtests from disk.
+
+    Returns a DataFrame with one row per age and columns retire_age, monthly_spending,
+    n_windows, success_rate (share of windows ending with non-negative wealth),
+    worst_start_month (history row of the window with the lowest final wealth),
+    worst_final_wealth, max_spending_all_windows (largest spending that survives every
+    window, from the per-window spending thresholds), enjoyment_mean and one
+    final_wealth_qNN column per quantile. Ages whose spending is None / NaN only get the
+    threshold column.
+    """
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    windows = return_source.rolling_windows(months)
+    spendings = np.broadcast_to(np.asarray(monthly_spendings, dtype=float), (len(ages),))
+    incomes = np.stack([income_schedule(retire_age=age, **sim_kwargs) for age in ages], axis=1)
+    thresholds = spending_thresholds(windows, incomes, sim_kwargs["initial_wealth"])
+
+    rows = []
+    for age, spend, age_thresholds in zip(ages, spendings, thresholds):
+        row = {
+            "retire_age": age,
+            "monthly_spending": spend,
+            "n_windows": windows.shape[1],
+            "success_rate": None,
+            "worst_start_month": None,
+            "worst_final_wealth": None,
+            "max_spending_all_windows": float(age_thresholds.min()),
+            "enjoyment_mean": None,
+        }
+        if not np.isnan(spend):
+            schedule = policy_schedule(retire_age=age, monthly_spending=spend, **sim_kwargs)
+            res = simulate_paths(windows, schedule, sim_kwargs["initial_wealth"])
+            final_wealth = res["final_wealth"]
+            worst = int(np.argmin(final_wealth))
+            row["success_rate"] = float(np.mean(final_wealth >= 0))
+            row["worst_start_month"] = worst
+            row["worst_final_wealth"] = float(final_wealth[worst])
+            row["enjoyment_mean"] = float(res["total_enjoyment"].mean())
+            for q, value in zip(quantiles, np.quantile(final_wealth, quantiles)):
+                row[f"final_wealth_q{round(q * 100):02d}"] = float(value)
+        rows.append(row)
+
+    df = pd.DataFrame(rows).sort_values("retire_age").reset_index(drop=True)
+    return df
+
+
+def _shared_policies_statistics(
+    policy_indices: List[int],
+    returns: SharedArraySpec,
+    n_chunk_paths: int,
+    income: SharedArraySpec,
+    month_utility: SharedArraySpec,
+    spending: np.ndarray,
+    initial_wealth: float,
+    sampling: str,
+) -> List[PolicyStatistics]:
+    """
+    Worker side of simulate_policies: PolicyStatistics of the policies `policy_indices` on
+    the first n_chunk_paths columns of the shared return chunk.
+    """
+    all_stats = []
+    with ExitStack() as stack:
+        shared_returns = stack.enter_context(SharedArray.attach(returns))
+        shared_income = stack.enter_context(SharedArray.attach(income))
+        shared_utility = stack.enter_context(SharedArray.attach(month_utility))
+        for j in policy_indices:
+            schedule = {
+                "income": shared_income.array[j],
+                "month_utility": shared_utility.array[j],
+                "spending": spending[j],
+            }
+            res = simulate_paths(shared_returns.array[:, :n_chunk_paths], schedule, initial_wealth)
+            stats = PolicyStatistics(sampling)
+            stats.update(res["final_wealth"], res["total_enjoyment"])
+            all_stats.append(stats)
+    return all_stats
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",), volatile=("chunk_returns",))
+def simulate_policies(
+    retire_ages: list,
+    monthly_spendings: list,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    chunk_returns: Optional[Callable[[int], np.ndarray]] = None,
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> List[Dict[str, object]]:
+    """
+    simulate_monte_carlo summaries of the policies (retire_ages[i], monthly_spendings[i]),
+    all evaluated on the same return paths (common random numbers).
+
+    Each chunk of returns is generated once. With n_workers > 1 the chunk and the stacked
+    per-policy income and utility schedules are placed in shared memory (see
+    shared_arrays.py) and the policies are split between the workers, which attach to
+    them without copying; only the small SharedArraySpec handles are pickled. Per-policy
+    statistics are merged in chunk order, so results are identical for any worker count.
+    `return_source` bootstraps returns from history (see HistoricalReturns); `dtype` is
+    the type of the returns and path state, as in simulate_monte_carlo. `chunk_returns`
+    (chunk_index -> returns matrix of chunk_index, e.g. a store of return_chunk results
+    kept across calls) supplies the chunks instead of generating them from the seed;
+    calls with it are not cached. `cache` as in simulate_monte_carlo.
+
+    Returns one summary dict per policy (keys as in PolicyStatistics.summary), in input
+    order.
+    """
+    check_return_source(return_source, sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+    seed = resolve_seed(seed)
+    initial_wealth = sim_kwargs["initial_wealth"]
+
+    schedules = [
+        policy_schedule(retire_age=age, monthly_spending=spend, **sim_kwargs)
+        for age, spend in zip(retire_ages, monthly_spendings)
+    ]
+    stats = [PolicyStatistics(sampling) for _ in schedules]
+    n_chunks = -(-n_paths // chunk_size)
+    n_workers = min(resolve_workers(n_workers), len(schedules))
+    if chunk_returns is None:
+        chunk_returns = partial(
+            _returns_only,
+            seed,
+            months=months,
+            n_paths=n_paths,
+            chunk_size=chunk_size,
+            mu=mu,
+            sigma=sigma,
+            sampling=sampling,
+            return_source=return_source,
+            dtype=dtype,
+        )
+
+    if n_workers <= 1:
+        for chunk_index in range(n_chunks):
+            returns = chunk_returns(chunk_index)
+            for schedule, policy_stats in zip(schedules, stats):
+                res = simulate_paths(returns, schedule, initial_wealth)
+                policy_stats.update(res["final_wealth"], res["total_enjoyment"])
+        return [policy_stats.summary(quantiles) for policy_stats in stats]
+
+    batches = [batch.tolist() for batch in np.array_split(np.arange(len(schedules)), n_workers)]
+    spending = np.array([float(schedule["spending"]) for schedule in schedules])
+    with ExitStack() as stack:
+        # segments are unlinked when the stack unwinds, also on errors in the workers
+        shared_returns = stack.enter_context(SharedArray((months, min(chunk_size, n_paths)), dtype))
+        shared_income = stack.enter_context(SharedArray.from_array(np.stack([sch["income"] for sch in schedules])))
+        shared_utility = stack.enter_context(
+            SharedArray.from_array(np.stack([sch["month_utility"] for sch in schedules]))
+        )
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=n_workers))
+        for chunk_index in range(n_chunks):
+            returns = chunk_returns(chunk_index)
+            shared_returns.array[:, : returns.shape[1]] = returns
+            batch_stats = partial(
+                _shared_policies_statistics,
+                returns=shared_returns.spec,
+                n_chunk_paths=returns.shape[1],
+                income=shared_income.spec,
+                month_utility=shared_utility.spec,
+                spending=spending,
+                initial_wealth=initial_wealth,
+                sampling=sampling,
+            )
+            for batch, chunk_stats in zip(batches, parallel_map(batch_stats, batches, executor=pool, batch_size=1)):
+                for j, policy_chunk_stats in zip(batch, chunk_stats):
+                    stats[j].merge(policy_chunk_stats)
+    return [policy_stats.summary(quantiles) for policy_stats in stats]
+
+
+def validate_deterministic_limit(
+    retire_ages: list,
+    monthly_spendings: list,
+    mu: Optional[float] = None,
+    rtol: float = 1e-9,
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Check that the Monte Carlo model reduces to the deterministic one: with sigma=0 every
+    path earns the expected monthly return, so the enjoyment and final wealth of each
+    policy (retire_ages[i], monthly_spendings[i]) must match simulate_with_retirement at
+    growth `mu` (default: sim_kwargs["investment_annual_growth"]) up to rounding.
+
+    Returns a DataFrame with columns retire_age, monthly_spending, enjoyment_monte_carlo,
+    enjoyment_deterministic, final_wealth_monte_carlo, final_wealth_deterministic,
+    agrees (both within `rtol`, relative to the final wealth's scale).
+    """
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    summaries = simulate_policies(
+        retire_ages=retire_ages, monthly_spendings=monthly_spendings, sigma=0.0, n_paths=1, seed=0, mu=mu, **sim_kwargs
+    )
+    deterministic = [
+        simulate_with_retirement(
+            **{**sim_kwargs, "investment_annual_growth": mu}, retire_age=age, monthly_spending=spend
+        )
+        for age, spend in zip(retire_ages, monthly_spendings)
+    ]
+    enjoyment_mc = np.array([summary["enjoyment_mean"] for summary in summaries])
+    enjoyment_det = np.array([res["total_enjoyment"] for res in deterministic])
+    wealth_mc = np.array([summary["final_wealth_mean"] for summary in summaries])
+    wealth_det = np.array([res["final_wealth"] for res in deterministic])
+    wealth_scale = max(abs(sim_kwargs["initial_wealth"]), sim_kwargs["initial_monthly_income"] * MONTHS_PER_YEAR)
+    agrees = np.isclose(enjoyment_mc, enjoyment_det, rtol=rtol, atol=0.0) & np.isclose(
+        wealth_mc, wealth_det, rtol=rtol, atol=rtol * wealth_scale
+    )
+    return pd.DataFrame(
+        {
+            "retire_age": list(retire_ages),
+            "monthly_spending": list(monthly_spendings),
+            "enjoyment_monte_carlo": enjoyment_mc,
+            "enjoyment_deterministic": enjoyment_det,
+            "final_wealth_monte_carlo": wealth_mc,
+            "final_wealth_deterministic": wealth_det,
+            "agrees": agrees,
+        }
+    )
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",), volatile=("max_seconds",))
+def simulate_monte_carlo(
+    retire_age: float,
+    monthly_spending: float,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    control_variate: bool = False,
+    qmc_replicates: int = 8,
+    importance_sampling: bool = False,
+    tilt: Optional[float] = None,
+    tilt_window_years: float = 10.0,
+    pilot_paths: int = 2000,
+    ruin_tolerance: Optional[float] = None,
+    ruin_probability_target: Optional[float] = None,
+    confidence: float = 0.95,
+    min_paths: int = 4096,
+    max_seconds: Optional[float] = None,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> Dict[str, object]:
+    """
+    Monte Carlo evaluation of a (retire_age, monthly_spending) policy.
+
+    `sim_kwargs` are the deterministic model parameters (as for simulate_with_retirement);
+    investment returns are lognormal with annual expected return `mu` (defaults to
+    sim_kwargs["investment_annual_growth"]) and annual log-return volatility `sigma`.
+
+    Paths are generated and simulated `chunk_size` at a time (derived from
+    memory_budget_mb when not given) and folded into a PolicyStatistics accumulator, so
+    peak memory does not grow with n_paths. Terminal-wealth quantiles come from a
+    streaming sketch with 1% relative accuracy.
+
+    Variance reduction: `sampling` selects pseudo-random, antithetic or scrambled Sobol
+    shocks (see generate_standard_normals and resolve_chunking); control_variate=True
+    corrects the ruin probability with terminal wealth, whose expectation is the
+    deterministic simulate_with_retirement final wealth at growth `mu`.
+
+    importance_sampling=True shifts the shocks of the first `tilt_window_years` of
+    retirement down by `tilt` standard deviations (chosen by select_tilt on a
+    `pilot_paths` pilot run when None) and reweights paths by their likelihood ratios, so
+    rare ruin events are sampled often while the estimates stay unbiased.
+
+    Adaptive path count: when ruin_tolerance or ruin_probability_target is given, n_paths
+    is a budget rather than a fixed size. Chunks of paths (at most min_paths each) are
+    added until, after at least min_paths paths, the `confidence` interval on P(ruin) is
+    narrower than +/- ruin_tolerance, or excludes ruin_probability_target (the policy is
+    clearly above or below p*), or the path budget or max_seconds is used up.
+
+    n_workers > 1 computes chunks on a process pool (see iter_chunk_results; adaptive runs
+    dispatch n_workers chunks at a time). Chunks are merged in chunk order, so results
+    are identical for any worker count.
+
+    `return_source` (a HistoricalReturns) replaces the lognormal returns by a stationary
+    block bootstrap of historical returns; mu and sigma are then ignored, and only plain
+    pseudo-random sampling without control variate or importance sampling is available.
+
+    dtype="float32" generates returns and steps path wealth in single precision (twice the
+    paths per chunk, half the memory traffic); enjoyment totals and all statistics are
+    still accumulated in float64. Check with validate_float32 that ruin probabilities are
+    unaffected for the configuration at hand.
+
+    `cache` (result_cache.ResultCache) serves repeated calls with the same parameters and
+    seed from disk; runs with seed=None or a max_seconds limit are never cached.
+
+    Returns a dict with keys: ruin_probability, ruin_probability_stderr,
+    effective_sample_size, final_wealth_mean, final_wealth_quantiles ({quantile: value}),
+    enjoyment_mean, enjoyment_std, n_paths, tilt (None without importance sampling),
+    stop_reason ("n_paths", "tolerance", "target", "time").
+    """
+    check_return_source(return_source, sampling, control_variate, importance_sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    adaptive = ruin_tolerance is not None or ruin_probability_target is not None
+    if adaptive:
+        budget_chunk = chunk_size_for_budget(months, memory_budget_mb, np.dtype(dtype).itemsize)
+        chunk_size = min(chunk_size or budget_chunk, min_paths)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+
+    expected_final_wealth = None
+    if control_variate:
+        expected_final_wealth = simulate_with_retirement(
+            **{**sim_kwargs, "investment_annual_growth": mu},
+            retire_age=retire_age,
+            monthly_spending=monthly_spending,
+            engine="closed_form",
+        )["final_wealth"]
+
+    seed = resolve_seed(seed)
+    tilt_spec = None
+    if importance_sampling:
+        if tilt is None:
+            tilt = select_tilt(
+                retire_age=retire_age,
+                monthly_spending=monthly_spending,
+                sigma=sigma,
+                seed=seed + 1,
+                mu=mu,
+                pilot_paths=pilot_paths,
+                tilt_window_years=tilt_window_years,
+                **sim_kwargs,
+            )
+        tilt_spec = (tilt, tilt_window(retire_age, tilt_window_years, **sim_kwargs))
+
+    schedule = policy_schedule(retire_age=retire_age, monthly_spending=monthly_spending, **sim_kwargs)
+    stats = PolicyStatistics(sampling, expected_final_wealth)
+    stop_reason = "n_paths"
+    start_time = time.perf_counter()
+    chunk_stats = partial(
+        policy_chunk_statistics,
+        seed,
+        months=months,
+        n_paths=n_paths,
+        chunk_size=chunk_size,
+        mu=mu,
+        sigma=sigma,
+        schedule=schedule,
+        initial_wealth=sim_kwargs["initial_wealth"],
+        sampling=sampling,
+        tilt=tilt_spec,
+        return_source=return_source,
+        dtype=dtype,
+    )
+    wave_size = resolve_workers(n_workers) if adaptive else None
+    for chunk in iter_chunk_results(chunk_stats, -(-n_paths // chunk_size), n_workers, wave_size):
+        # folded in chunk order, so the floating-point result is independent of who
+        # computed each chunk
+        stats.merge(chunk)
+        if not adaptive or stats.n_paths >= n_paths:
+            continue
+        if max_seconds is not None and time.perf_counter() - start_time >= max_seconds:
+            stop_reason = "time"
+            break
+        if stats.n_paths < min_paths:
+            continue
+        p, stderr = stats.ruin_estimate()
+        half_width = ruin_interval_half_width(p, stderr, stats.n_paths, confidence)
+        if ruin_tolerance is not None and half_width <= ruin_tolerance:
+            stop_reason = "tolerance"
+            break
+        if ruin_probability_target is not None and abs(p - ruin_probability_target) > half_width:
+            stop_reason = "target"
+            break
+
+    summary = stats.summary(quantiles)
+    summary["tilt"] = tilt if importance_sampling else None
+    summary["stop_reason"] = stop_reason
+    return summary
+
+
+def validate_float32(
+    retire_ages: list,
+    monthly_spendings: list,
+    sigma: float,
+    n_paths: int = 20000,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    tolerance: Optional[float] = None,
+    return_source: Optional[HistoricalReturns] = None,
+    **sim_kwargs,
+) -> pd.DataFrame:
+    """
+    Check that dtype="float32" does not change the ruin probabilities of the policies
+    (retire_ages[i], monthly_spendings[i]) for this configuration.
+
+    Every chunk of returns is drawn in float64 and the policies are stepped on it twice,
+    once as is and once cast to float32, so the comparison isolates rounding in the path
+    state from sampling noise. A policy is `safe` when the two ruin probabilities differ by
+    at most `tolerance`, by default a tenth of the float64 estimate's binomial standard
+    error (precision error an order of magnitude below Monte Carlo noise); with a zero
+    standard error no path may change its ruin outcome.
+
+    Returns a DataFrame with columns retire_age, monthly_spending,
+    ruin_probability_float64, ruin_probability_float32, difference, ruin_flips (paths
+    ruined in one precision but not the other), monte_carlo_stderr, safe.
+    """
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    n_paths, chunk_size = resolve_chunking(months, n_paths, chunk_size, memory_budget_mb)
+    seed = resolve_seed(seed)
+
+    schedules = [
+        policy_schedule(retire_age=age, monthly_spending=spend, **sim_kwargs)
+        for age, spend in zip(retire_ages, monthly_spendings)
+    ]
+    ruined_64 = np.zeros(len(schedules), dtype=np.int64)
+    ruined_32 = np.zeros(len(schedules), dtype=np.int64)
+    flips = np.zeros(len(schedules), dtype=np.int64)
+    for returns, _ in iter_return_chunks(seed, months, n_paths, chunk_size, mu, sigma, return_source=return_source):
+        returns_32 = returns.astype(np.float32)
+        for j, schedule in enumerate(schedules):
+            ruin_64 = simulate_paths(returns, schedule, sim_kwargs["initial_wealth"])["final_wealth"] < 0
+            ruin_32 = simulate_paths(returns_32, schedule, sim_kwargs["initial_wealth"])["final_wealth"] < 0
+            ruined_64[j] += np.count_nonzero(ruin_64)
+            ruined_32[j] += np.count_nonzero(ruin_32)
+            flips[j] += np.count_nonzero(ruin_64 != ruin_32)
+
+    p_64 = ruined_64 / n_paths
+    p_32 = ruined_32 / n_paths
+    stderr = np.sqrt(p_64 * (1 - p_64) / n_paths)
+    difference = np.abs(p_32 - p_64)
+    if tolerance is None:
+        safe = np.where(stderr > 0, difference <= 0.1 * stderr, flips == 0)
+    else:
+        safe = difference <= tolerance
+    return pd.DataFrame(
+        {
+            "retire_age": list(retire_ages),
+            "monthly_spending": list(monthly_spendings),
+            "ruin_probability_float64": p_64,
+            "ruin_probability_float32": p_32,
+            "difference": difference,
+            "ruin_flips": flips,
+            "monte_carlo_stderr": stderr,
+            "safe": safe,
+        }
+    )
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",), volatile=("max_seconds",))
+def max_ruin_constrained_spending_for_retire_age(
+    retire_age: float,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    ruin_probability_max: float,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    spending_tolerance: Optional[float] = None,
+    confidence: float = 0.95,
+    min_paths: int = 4096,
+    max_seconds: Optional[float] = None,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> Dict[str, object]:
+    """
+    Ruin-constrained variant of max_feasible_spending_for_retire_age: the largest spending
+    on the grid [spend_min, spend_max] with step `step` whose Monte Carlo ruin probability
+    is at most ruin_probability_max.
+
+    One set of return paths is simulated once to get every path's spending threshold; the
+    constrained optimum is an empirical quantile of the thresholds and the whole
+    P(ruin)-vs-spending curve over the grid comes from the same vector. The chosen
+    policy is then evaluated on the same paths (replayed chunk by chunk from the seed) for
+    its enjoyment and wealth statistics. Only the n_paths thresholds are held in memory;
+    return matrices are bounded by the chunk size as in simulate_monte_carlo. `sampling`
+    selects the shock generator as in simulate_monte_carlo.
+
+    With spending_tolerance, n_paths is a budget: chunks of at most min_paths paths are
+    added until the `confidence` interval on the spending quantile (spending_interval_width)
+    is narrower than spending_tolerance dollars, or the path budget or max_seconds is
+    used up. `n_workers` spreads the chunks over processes, `return_source` bootstraps
+    historical returns and `dtype` sets the path precision, as in simulate_monte_carlo.
+    `cache` as in simulate_monte_carlo.
+
+    Returns a dict with keys: max_spending (continuous), best_monthly_spending (None if no
+    grid spending satisfies the constraint), ruin_probability, final_wealth_quantiles,
+    enjoyment_mean, ruin_curve (DataFrame with monthly_spending, ruin_probability),
+    n_paths (paths actually used).
+    """
+    check_return_source(return_source, sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+
+    if spending_tolerance is not None:
+        budget_chunk = chunk_size_for_budget(months, memory_budget_mb, np.dtype(dtype).itemsize)
+        chunk_size = min(chunk_size or budget_chunk, min_paths)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+    seed = resolve_seed(seed)
+
+    chunk_kwargs = dict(
+        months=months,
+        n_paths=n_paths,
+        chunk_size=chunk_size,
+        mu=mu,
+        sigma=sigma,
+        sampling=sampling,
+        return_source=return_source,
+        dtype=dtype,
+    )
+    income = income_schedule(retire_age=retire_age, **sim_kwargs)
+    chunk_thresholds = partial(
+        chunk_spending_thresholds, seed, income=income, initial_wealth=sim_kwargs["initial_wealth"], **chunk_kwargs
+    )
+    wave_size = resolve_workers(n_workers) if spending_tolerance is not None else None
+    chunks = []
+    start_time = time.perf_counter()
+    for chunk in iter_chunk_results(chunk_thresholds, -(-n_paths // chunk_size), n_workers, wave_size):
+        chunks.append(chunk)
+        if spending_tolerance is None:
+            continue
+        if max_seconds is not None and time.perf_counter() - start_time >= max_seconds:
+            break
+        n_done = sum(len(chunk) for chunk in chunks)
+        if n_done >= min_paths and spending_interval_width(
+            np.concatenate(chunks), ruin_probability_max, confidence
+        ) <= spending_tolerance:
+            break
+    thresholds = np.concatenate(chunks)
+    n_paths = chunk_kwargs["n_paths"] = len(thresholds)
+
+    spend_range = range(spend_min, spend_max + step, step)
+    spend_grid = np.asarray(spend_range, dtype=float)
+    max_spending = max_spending_for_ruin_probability(thresholds, ruin_probability_max)
+    ruin_curve = pd.DataFrame(
+        {"monthly_spending": spend_grid, "ruin_probability": ruin_probability_curve(thresholds, spend_grid)}
+    )
+
+    result = {
+        "max_spending": max_spending,
+        "best_monthly_spending": None,
+        "ruin_probability": None,
+        "final_wealth_quantiles": None,
+        "enjoyment_mean": None,
+        "ruin_curve": ruin_curve,
+        "n_paths": n_paths,
+    }
+    if max_spending < spend_range[0]:
+        return result
+
+    best_s_index = min(int((max_spending - spend_range[0]) // step), len(spend_range) - 1)
+    best_s = spend_range[best_s_index]
+    schedule = policy_schedule(retire_age=retire_age, monthly_spending=best_s, **sim_kwargs)
+    stats = PolicyStatistics(sampling)
+    chunk_stats = partial(
+        policy_chunk_statistics, seed, schedule=schedule, initial_wealth=sim_kwargs["initial_wealth"], **chunk_kwargs
+    )
+    for chunk in iter_chunk_results(chunk_stats, len(chunks), n_workers):
+        stats.merge(chunk)
+    summary = stats.summary(quantiles)
+
+    result["best_monthly_spending"] = best_s
+    result["ruin_probability"] = summary["ruin_probability"]
+    result["final_wealth_quantiles"] = summary["final_wealth_quantiles"]
+    result["enjoyment_mean"] = summary["enjoyment_mean"]
+    return result
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",))
+def ruin_constrained_spending_root(
+    retire_age: float,
+    spend_min: float,
+    spend_max: float,
+    ruin_probability_max: float,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    tolerance: float = 1.0,
+    max_iterations: int = 50,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+    **sim_kwargs,
+) -> Dict[str, object]:
+    """
+    Continuous ruin-constrained spending: the largest spending on [spend_min, spend_max]
+    with P(ruin)(s) <= ruin_probability_max, found with find_root to within `tolerance`
+    dollars (the bracket between the returned spending and the smallest spending found
+    to break the constraint is at most `tolerance` wide).
+
+    Every evaluation is a simulate_monte_carlo run with the same seed, so all spendings
+    are tried on the same return paths (common random numbers) and the estimated
+    P(ruin)(s) is a deterministic, non-decreasing step function that the root-finder can
+    bracket. Unlike max_ruin_constrained_spending_for_retire_age this does not rely on
+    final wealth being affine in spending on each path, so it also works for models where
+    the per-path thresholds are unavailable. Sampling options are as in
+    simulate_monte_carlo.
+
+    Returns a dict with keys: max_spending (spend_max if it satisfies the constraint, None
+    if spend_min does not), ruin_probability, final_wealth_quantiles, enjoyment_mean
+    (at max_spending), iterations (Monte Carlo runs after the two ends), converged.
+    """
+    seed = resolve_seed(seed)
+    summaries = {}
+
+    def ruin_probability(spending: float) -> float:
+        summaries[spending] = simulate_monte_carlo(
+            retire_age=retire_age,
+            monthly_spending=spending,
+            sigma=sigma,
+            n_paths=n_paths,
+            seed=seed,
+            mu=mu,
+            quantiles=quantiles,
+            chunk_size=chunk_size,
+            memory_budget_mb=memory_budget_mb,
+            sampling=sampling,
+            qmc_replicates=qmc_replicates,
+            n_workers=n_workers,
+            return_source=return_source,
+            dtype=dtype,
+            **sim_kwargs,
+        )
+        return summaries[spending]["ruin_probability"]
+
+    p_low = ruin_probability(spend_min)
+    p_high = ruin_probability(spend_max)
+    result = {
+        "max_spending": None,
+        "ruin_probability": None,
+        "final_wealth_quantiles": None,
+        "enjoyment_mean": None,
+        "iterations": 0,
+        "converged": True,
+    }
+    if p_low > ruin_probability_max:
+        return result
+    if p_high <= ruin_probability_max:
+        best_s = spend_max
+    else:
+        root = find_root(
+            ruin_probability,
+            spend_min,
+            spend_max,
+            target=ruin_probability_max,
+            tolerance=tolerance,
+            max_iterations=max_iterations,
+            f_low=p_low,
+            f_high=p_high,
+        )
+        best_s = root["low"]
+        result["iterations"] = root["iterations"]
+        result["converged"] = root["converged"]
+
+    summary = summaries[best_s]
+    result["max_spending"] = best_s
+    result["ruin_probability"] = summary["ruin_probability"]
+    result["final_wealth_quantiles"] = summary["final_wealth_quantiles"]
+    result["enjoyment_mean"] = summary["enjoyment_mean"]
+    return result
+
+
+def common_spending_thresholds(
+    ages: list,
+    sigma: float,
+    n_paths: int,
+    seed: int,
+    mu: float,
+    chunk_size: int,
+    sampling: str = "pseudo_random",
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    chunk_returns: Optional[Callable[[int], np.ndarray]] = None,
+    **sim_kwargs,
+) -> np.ndarray:
+    """
+    (len(ages), n_paths) per-path spending thresholds of every retire age on one common
+    set of return paths. Each chunk of returns is generated once and swept for all ages
+    together, so generation cost is paid once per sweep and differences between ages are
+    not blurred by independent sampling noise. Chunks may be computed by `n_workers`
+    processes (see iter_chunk_results), or read in this process from `chunk_returns` as
+    in simulate_policies.
+    """
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    incomes = np.stack([income_schedule(retire_age=age, **sim_kwargs) for age in ages], axis=1)
+    chunk_thresholds = partial(
+        chunk_spending_thresholds,
+        seed,
+        months=months,
+        n_paths=n_paths,
+        chunk_size=chunk_size,
+        mu=mu,
+        sigma=sigma,
+        income=incomes,
+        initial_wealth=sim_kwargs["initial_wealth"],
+        sampling=sampling,
+        return_source=return_source,
+        dtype=dtype,
+    )
+    n_chunks = -(-n_paths // chunk_size)
+    if chunk_returns is None:
+        chunks = iter_chunk_results(chunk_thresholds, n_chunks, n_workers)
+    else:
+        chunks = (
+            spending_thresholds(chunk_returns(i), incomes, sim_kwargs["initial_wealth"]) for i in range(n_chunks)
+        )
+    thresholds = np.empty((len(ages), n_paths))
+    start = 0
+    for chunk in chunks:
+        stop = start + chunk.shape[1]
+        thresholds[:, start:stop] = chunk
+        start = stop
+    return thresholds
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",))
+def run_grid_ages_monte_carlo(
+    ages: list,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    ruin_probability_max: float,
+    sim_kwargs: dict,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+) -> pd.DataFrame:
+    """
+    Ruin-constrained counterpart of run_grid_ages using common random numbers: the
+    ruin-constrained spending of every age (as in
+    max_ruin_constrained_spending_for_retire_age) is read off thresholds computed on one
+    shared set of return paths, and the chosen policies are then evaluated together on a
+    replay of the same paths (simulate_policies). `n_workers` spreads the threshold chunks
+    and then the policies over processes; `return_source` and `dtype` are as in
+    simulate_monte_carlo. `cache` serves repeated sweeps from disk.
+
+    Returns a DataFrame with columns retire_age, max_spending, best_monthly_spending,
+    ruin_probability, median_final_wealth, enjoyment_mean.
+    """
+    check_return_source(return_source, sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+    seed = resolve_seed(seed)
+
+    thresholds = common_spending_thresholds(
+        ages,
+        sigma,
+        n_paths,
+        seed,
+        mu,
+        chunk_size,
+        sampling,
+        n_workers=n_workers,
+        return_source=return_source,
+        dtype=dtype,
+        **sim_kwargs,
+    )
+
+    spend_range = range(spend_min, spend_max + step, step)
+    best_s = {}
+    max_spending = {}
+    for i, age in enumerate(ages):
+        max_spending[age] = max_spending_for_ruin_probability(thresholds[i], ruin_probability_max)
+        if max_spending[age] >= spend_range[0]:
+            best_s[age] = spend_range[min(int((max_spending[age] - spend_range[0]) // step), len(spend_range) - 1)]
+
+    summaries = {}
+    if best_s:
+        policy_summaries = simulate_policies(
+            retire_ages=list(best_s),
+            monthly_spendings=list(best_s.values()),
+            sigma=sigma,
+            n_paths=n_paths,
+            seed=seed,
+            mu=mu,
+            quantiles=(0.5,),
+            chunk_size=chunk_size,
+            sampling=sampling,
+            n_workers=n_workers,
+            return_source=return_source,
+            dtype=dtype,
+            **sim_kwargs,
+        )
+        summaries = dict(zip(best_s, policy_summaries))
+
+    rows = []
+    for age in ages:
+        summary = summaries.get(age)
+        rows.append(
+            {
+                "retire_age": age,
+                "max_spending": max_spending[age],
+                "best_monthly_spending": best_s.get(age),
+                "ruin_probability": summary["ruin_probability"] if summary else None,
+                "median_final_wealth": summary["final_wealth_quantiles"][0.5] if summary else None,
+                "enjoyment_mean": summary["enjoyment_mean"] if summary else None,
+            }
+        )
+
+    df = pd.DataFrame(rows).sort_values("retire_age").reset_index(drop=True)
+    return df
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",))
+def ruin_probability_surface(
+    ages: list,
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    sim_kwargs: dict,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+) -> pd.DataFrame:
+    """
+    P(ruin) of every (retire_age, spending) policy on the grid, all evaluated on the same
+    return paths via common_spending_thresholds (chunks computed by `n_workers` processes;
+    `return_source`, `dtype` and `cache` as in simulate_monte_carlo).
+
+    Returns a DataFrame indexed by retire_age with one column per grid spending.
+    """
+    check_return_source(return_source, sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    months = int((sim_kwargs["final_age"] - sim_kwargs["initial_age"]) * MONTHS_PER_YEAR)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+
+    thresholds = common_spending_thresholds(
+        ages,
+        sigma,
+        n_paths,
+        resolve_seed(seed),
+        mu,
+        chunk_size,
+        sampling,
+        n_workers=n_workers,
+        return_source=return_source,
+        dtype=dtype,
+        **sim_kwargs,
+    )
+    spend_grid = np.asarray(range(spend_min, spend_max + step, step), dtype=float)
+    surface = np.stack([ruin_probability_curve(t, spend_grid) for t in thresholds])
+    return pd.DataFrame(surface, index=pd.Index(ages, name="retire_age"), columns=spend_grid)
+
+
+DEFAULT_PARETO_RUIN_LEVELS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5)
+
+
+@cacheable(ENGINE_VERSION, ignore=("n_workers",))
+def optimize_ruin_constrained_policy(
+    spend_min: int,
+    spend_max: int,
+    step: int,
+    ruin_probability_max: float,
+    sim_kwargs: dict,
+    sigma: float,
+    n_paths: int,
+    seed: Optional[int] = None,
+    mu: Optional[float] = None,
+    age_min: Optional[float] = None,
+    age_max: Optional[float] = None,
+    coarse_months: int = MONTHS_PER_YEAR,
+    refine_top: int = 3,
+    pareto_ruin_levels: Tuple[float, ...] = DEFAULT_PARETO_RUIN_LEVELS,
+    chunk_size: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    sampling: str = "pseudo_random",
+    qmc_replicates: int = 8,
+    n_workers: Optional[int] = 1,
+    return_source: Optional[HistoricalReturns] = None,
+    dtype: str = "float64",
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, object]:
+    """
+    Policy (retire_age, monthly_spending) with the highest expected enjoyment subject to
+    P(ruin) <= ruin_probability_max, with retirement at monthly resolution in
+    [age_min, age_max] (default: the whole horizon).
+
+    Every policy is evaluated on the same return paths (common random numbers, one seed),
+    as in run_grid_ages_monte_carlo: for each retirement month, the ruin-constrained grid
+    spending is read off the per-path thresholds (common_spending_thresholds) and its
+    enjoyment comes from simulate_policies. Retirement months are first searched every
+    `coarse_months` months. Then every month within `coarse_months` of each of the
+    `refine_top` best coarse peaks (coarse months at least as good as both neighbours)
+    is searched, and the search re-centers on the best month until it stays put. This is a local search: near its top the enjoyment curve
+    is flat and noisy, so refining several coarse peaks makes it likely, but does not
+    guarantee, that it finds the argmax of a full monthly sweep.
+
+    The Pareto frontier of expected enjoyment against ruin probability is built from
+    every policy evaluated plus, for the optimal month and the months `coarse_months`
+    either side of it, the grid spendings whose ruin probability is at most each level in
+    `pareto_ruin_levels`. It keeps the policies that no other policy beats on both
+    enjoyment and ruin probability.
+
+    When all n_paths paths fit in memory_budget_mb, the return chunks are generated once
+    and handed to every round as `chunk_returns`; otherwise each round regenerates them
+    from the seed.
+    Sampling, worker, return-source, dtype and cache options are as in
+    run_grid_ages_monte_carlo.
+
+    Returns a dict with keys: retire_month, retire_age, max_spending (continuous),
+    best_monthly_spending, ruin_probability, median_final_wealth, enjoyment_mean (None if
+    no policy satisfies the constraint), policies (DataFrame of the ruin-constrained
+    policy of every retirement month searched, columns as in run_grid_ages_monte_carlo
+    plus retire_month), frontier (DataFrame with retire_age, monthly_spending,
+    ruin_probability, enjoyment_mean, sorted by ruin_probability), n_policies (policies
+    simulated).
+    """
+    check_return_source(return_source, sampling)
+    if mu is None:
+        mu = sim_kwargs["investment_annual_growth"]
+    initial_age, final_age = sim_kwargs["initial_age"], sim_kwargs["final_age"]
+    months = int((final_age - initial_age) * MONTHS_PER_YEAR)
+    n_paths, chunk_size = resolve_chunking(
+        months, n_paths, chunk_size, memory_budget_mb, sampling, qmc_replicates, dtype
+    )
+    seed = resolve_seed(seed)
+    ages = age_schedule(initial_age, months)
+    k_low = 0 if age_min is None else retire_month_index(initial_age, final_age, age_min)
+    k_high = months if age_max is None else retire_month_index(initial_age, final_age, age_max)
+    spend_range = range(spend_min, spend_max + step, step)
+
+    path_kwargs = dict(
+        sigma=sigma,
+        n_paths=n_paths,
+        seed=seed,
+        mu=mu,
+        chunk_size=chunk_size,
+        sampling=sampling,
+        n_workers=n_workers,
+        return_source=return_source,
+        dtype=dtype,
+    )
+    policies = {}  # retire month -> ruin-constrained policy row
+    thresholds = {}  # retire month -> per-path spending thresholds
+    n_policies = 0
+
+    # with all paths within the memory budget, every return chunk is generated once and
+    # reused by all rounds and the frontier ladder
+    returns_cache = None
+    if n_paths <= chunk_size_for_budget(months, memory_budget_mb, np.dtype(dtype).itemsize):
+        returns_cache = {}
+    generate_returns = partial(
+        _returns_only,
+        seed,
+        months=months,
+        n_paths=n_paths,
+        chunk_size=chunk_size,
+        mu=mu,
+        sigma=sigma,
+        sampling=sampling,
+        return_source=return_source,
+        dtype=dtype,
+    )
+
+    def chunk_returns(chunk_index: int) -> np.ndarray:
+        if chunk_index not in returns_cache:
+            returns_cache[chunk_index] = generate_returns(chunk_index)
+        return returns_cache[chunk_index]
+
+    if returns_cache is not None:
+        path_kwargs["chunk_returns"] = chunk_returns
+
+    def month_thresholds(retire_months: list) -> np.ndarray:
+        return common_spending_thresholds(
+            [ages[k] for k in retire_months],
+            sigma,
+            n_paths,
+            seed,
+            mu,
+            chunk_size,
+            sampling,
+            n_workers=n_workers,
+            return_source=return_source,
+            dtype=dtype,
+            chunk_returns=path_kwargs.get("chunk_returns"),
+            **sim_kwargs,
+        )
+
+    def policy_summaries(retire_ages: list, monthly_spendings: list) -> List[Dict[str, object]]:
+        return simulate_policies(
+            retire_ages=retire_ages,
+            monthly_spendings=monthly_spendings,
+            quantiles=(0.5,),
+            **path_kwargs,
+            **sim_kwargs,
+        )
+
+    def grid_spending(max_spending: float) -> Optional[int]:
+        if max_spending < spend_range[0]:
+            return None
+        return spend_range[min(int((max_spending - spend_range[0]) // step), len(spend_range) - 1)]
+
+    def evaluate(retire_months: list) -> None:
+        nonlocal n_policies
+        new = sorted(set(retire_months) - set(policies))
+        if not new:
+            return
+        new_thresholds = month_thresholds(new)
+        feasible = []
+        for k, k_thresholds in zip(new, new_thresholds):
+            thresholds[k] = k_thresholds
+            max_spending = max_spending_for_ruin_probability(k_thresholds, ruin_probability_max)
+            policies[k] = {
+                "retire_month": k,
+                "retire_age": ages[k],
+                "max_spending": max_spending,
+                "best_monthly_spending": grid_spending(max_spending),
+                "ruin_probability": None,
+                "median_final_wealth": None,
+                "enjoyment_mean": None,
+            }
+            if policies[k]["best_monthly_spending"] is not None:
+                feasible.append(k)
+        if not feasible:
+            return
+        summaries = policy_summaries(
+            [ages[k] for k in feasible], [policies[k]["best_monthly_spending"] for k in feasible]
+        )
+        n_policies += len(feasible)
+        for k, summary in zip(feasible, summaries):
+            policies[k]["ruin_probability"] = summary["ruin_probability"]
+            policies[k]["median_final_wealth"] = summary["final_wealth_quantiles"][0.5]
+            policies[k]["enjoyment_mean"] = summary["enjoyment_mean"]
+
+    def best_month() -> Optional[int]:
+        scored = [k for k in policies if policies[k]["enjoyment_mean"] is not None]
+        return max(scored, key=lambda k: policies[k]["enjoyment_mean"]) if scored else None
+
+    def refine(k: int) -> None:
+        evaluate(list(range(max(k_low, k - coarse_months), min(k_high, k + coarse_months) + 1)))
+
+    # coarse pass, monthly refinement around the best `refine_top` coarse peaks, then
+    # re-centering on the incumbent until it stops moving
+    coarse = sorted(set(range(k_low, k_high + 1, coarse_months)) | {k_high})
+    evaluate(coarse)
+    coarse_enjoyment = [policies[k]["enjoyment_mean"] for k in coarse]
+    coarse_enjoyment = np.array([-np.inf if e is None else e for e in coarse_enjoyment])
+    padded = np.concatenate([[-np.inf], coarse_enjoyment, [-np.inf]])
+    is_peak = (coarse_enjoyment > -np.inf) & (coarse_enjoyment >= padded[:-2]) & (coarse_enjoyment >= padded[2:])
+    peaks = [coarse[i] for i in np.flatnonzero(is_peak)]
+    for k in sorted(peaks, key=lambda k: policies[k]["enjoyment_mean"], reverse=True)[:refine_top]:
+        refine(k)
+    k_best = best_month()
+    while k_best is not None:
+        refine(k_best)
+        k_next = best_month()
+        if k_next == k_best:
+            break
+        k_best = k_next
+
+    # Pareto frontier: every evaluated policy plus a ladder of ruin levels around the optimum
+    candidates = [
+        (ages[k], row["best_monthly_spending"], row["ruin_probability"], row["enjoyment_mean"])
+        for k, row in policies.items()
+        if row["enjoyment_mean"] is not None
+    ]
+    ladder = {}
+    ladder_months = [] if k_best is None else [k_best - coarse_months, k_best, k_best + coarse_months]
+    for k in [k for k in ladder_months if k in thresholds]:
+        for level in pareto_ruin_levels:
+            spending = grid_spending(max_spending_for_ruin_probability(thresholds[k], level))
+            if spending is not None:
+                ladder[(ages[k], spending)] = None
+    ladder = [policy for policy in ladder if policy not in {(age, s) for age, s, _, _ in candidates}]
+    if ladder:
+        summaries = policy_summaries([age for age, _ in ladder], [spending for _, spending in ladder])
+        n_policies += len(ladder)
+        candidates += [
+            (age, spending, summary["ruin_probability"], summary["enjoyment_mean"])
+            for (age, spending), summary in zip(ladder, summaries)
+        ]
+    frontier = []
+    for age, spending, ruin, enjoyment in sorted(candidates, key=lambda c: (c[2], -c[3])):
+        if not frontier or enjoyment > frontier[-1]["enjoyment_mean"]:
+            frontier.append(
+                {"retire_age": age, "monthly_spending": spending, "ruin_probability": ruin, "enjoyment_mean": enjoyment}
+            )
+
+    best = policies[k_best] if k_best is not None else dict.fromkeys(policies[coarse[0]], None)
+    return {
+        "retire_month": best["retire_month"],
+        "retire_age": best["retire_age"],
+        "max_spending": best["max_spending"],
+        "best_monthly_spending": best["best_monthly_spending"],
+        "ruin_probability": best["ruin_probability"],
+        "median_final_wealth": best["median_final_wealth"],
+        "enjoyment_mean": best["enjoyment_mean"],
+        "policies": pd.DataFrame([policies[k] for k in sorted(policies)]),
+        "frontier": pd.DataFrame(
+            frontier, columns=["retire_age", "monthly_spending", "ruin_probability", "enjoyment_mean"]
+        ),
+        "n_policies": n_policies,
+    }
+
+
+if __name__ == "__main__":
+    # Load configuration from config.json
+    with open("config.json", "r") as f:
+        config = json.load(f)
+
+    ages = list(range(int(config["initial_age"]), int(config["final_age"]) + 1))
+    sim_kwargs = {
+        "initial_age": config["initial_age"],
+        "final_age": config["final_age"],
+        "initial_wealth": config["initial_wealth"],
+        "initial_monthly_income": config["initial_monthly_income"],
+        "income_annual_growth": config["income_annual_growth"],
+        "retired_monthly_income": config["retired_monthly_income"],
+        "investment_annual_growth": config["investment_annual_growth"],
+        "utility_exponent_pre_retire": config["utility_exponent_pre_retire"],
+        "utility_exponent_post_retire": config["utility_exponent_post_retire"],
+        "utility_multiplier_post_retire": config["utility_multiplier_post_retire"],
+    }
+
+    cache = ResultCache(config["cache_dir"], config["cache_max_mb"]) if config["cache_dir"] else None
+    return_source = None
+    if config["historical_returns_csv"] is not None:
+        return_source = HistoricalReturns(
+            config["historical_returns_csv"],
+            column=config["historical_returns_column"],
+            block_length=config["bootstrap_block_months"],
+            start_window=config["bootstrap_start_window"],
+        )
+        print(
+            f"Bootstrapping {config['historical_returns_csv']}: mean annual return "
+            f"{return_source.mean_annual_return:.2%} (mu = {config['mu']:.2%} is ignored)"
+        )
+        print()
+
+    if config["optimize_retire_age"]:
+        # best ruin-constrained policy at monthly resolution and the enjoyment-vs-ruin frontier
+        best = optimize_ruin_constrained_policy(
+            spend_min=config["monthly_spending_min"],
+            spend_max=config["monthly_spending_max"],
+            step=config["monthly_spending_step"],
+            ruin_probability_max=config["ruin_probability_max"],
+            sim_kwargs=sim_kwargs,
+            mu=config["mu"],
+            sigma=config["sigma"],
+            n_paths=config["n_paths"],
+            seed=config["seed"],
+            memory_budget_mb=config["memory_budget_mb"],
+            sampling=config["sampling"],
+            qmc_replicates=config["qmc_replicates"],
+            n_workers=config["n_workers"],
+            return_source=return_source,
+            dtype=config["dtype"],
+            cache=cache,
+        )
+        pd.set_option(
+            "display.float_format", lambda x: f"{x:,.2f}" if pd.notnull(x) else "None"
+        )
+        if best["best_monthly_spending"] is None:
+            print("No policy satisfies the ruin constraint")
+        else:
+            print(
+                f"Best policy: retire at {best['retire_age']:.2f} (month {best['retire_month']}), spend "
+                f"{best['best_monthly_spending']} per month, P(ruin) {best['ruin_probability']:.4f}, "
+                f"expected enjoyment {best['enjoyment_mean']:,.2f} ({best['n_policies']} policies simulated)"
+            )
+        print()
+        print(best["frontier"].to_string(index=False))
+    else:
+        # deterministic max feasible spending per age, next to the ruin-constrained one
+        df = run_grid_ages(
+            ages=ages,
+            spend_min=config["monthly_spending_min"],
+            spend_max=config["monthly_spending_max"],
+            step=config["monthly_spending_step"],
+            sim_kwargs=sim_kwargs,
+            method="single_pass",
+            cache=cache,
+        )
+        if config["spending_tolerance"] is None:
+            # every age evaluated on the same return paths
+            mc_df = run_grid_ages_monte_carlo(
+                ages=ages,
+                spend_min=config["monthly_spending_min"],
+                spend_max=config["monthly_spending_max"],
+                step=config["monthly_spending_step"],
+                ruin_probability_max=config["ruin_probability_max"],
+                sim_kwargs=sim_kwargs,
+                mu=config["mu"],
+                sigma=config["sigma"],
+                n_paths=config["n_paths"],
+                seed=config["seed"],
+                memory_budget_mb=config["memory_budget_mb"],
+                sampling=config["sampling"],
+                qmc_replicates=config["qmc_replicates"],
+                n_workers=config["n_workers"],
+                return_source=return_source,
+                dtype=config["dtype"],
+                cache=cache,
+            )
+            rows = [
+                {
+                    "retire_age": age,
+                    "deterministic_spending": det_spend,
+                    "best_monthly_spending": mc_row["best_monthly_spending"],
+                    "ruin_probability": mc_row["ruin_probability"],
+                    "enjoyment_mean": mc_row["enjoyment_mean"],
+                }
+                for age, det_spend, (_, mc_row) in zip(df["retire_age"], df["best_monthly_spending"], mc_df.iterrows())
+            ]
+        else:
+            # adaptive path count, one age at a time
+            rows = []
+            for age, det_spend in zip(df["retire_age"], df["best_monthly_spending"]):
+                res = max_ruin_constrained_spending_for_retire_age(
+                    retire_age=age,
+                    spend_min=config["monthly_spending_min"],
+                    spend_max=config["monthly_spending_max"],
+                    step=config["monthly_spending_step"],
+                    ruin_probability_max=config["ruin_probability_max"],
+                    mu=config["mu"],
+                    sigma=config["sigma"],
+                    n_paths=config["n_paths"],
+                    seed=config["seed"],
+                    memory_budget_mb=config["memory_budget_mb"],
+                    sampling=config["sampling"],
+                    qmc_replicates=config["qmc_replicates"],
+                    spending_tolerance=config["spending_tolerance"],
+                    max_seconds=config["max_seconds"],
+                    n_workers=config["n_workers"],
+                    return_source=return_source,
+                    dtype=config["dtype"],
+                    cache=cache,
+                    **sim_kwargs,
+                )
+                rows.append(
+                    {
+                        "retire_age": age,
+                        "deterministic_spending": det_spend,
+                        "best_monthly_spending": res["best_monthly_spending"],
+                        "ruin_probability": res["ruin_probability"],
+                        "enjoyment_mean": res["enjoyment_mean"],
+                    }
+                )
+
+        pd.set_option(
+            "display.float_format", lambda x: f"{x:,.2f}" if pd.notnull(x) else "None"
+        )
+        print(pd.DataFrame(rows).to_string(index=False))
+
+        if config["control_variate"] or config["importance_sampling"] or config["ruin_tolerance"] is not None:
+            # re-estimate the ruin probability of every chosen policy on fresh paths
+            checks = []
+            for row in rows:
+                if pd.isnull(row["best_monthly_spending"]):
+                    continue
+                res = simulate_monte_carlo(
+                    retire_age=row["retire_age"],
+                    monthly_spending=row["best_monthly_spending"],
+                    mu=config["mu"],
+                    sigma=config["sigma"],
+                    n_paths=config["n_paths"],
+                    seed=None if config["seed"] is None else config["seed"] + 1,
+                    memory_budget_mb=config["memory_budget_mb"],
+                    sampling=config["sampling"],
+                    qmc_replicates=config["qmc_replicates"],
+                    control_variate=config["control_variate"],
+                    importance_sampling=config["importance_sampling"],
+                    tilt_window_years=config["tilt_window_years"],
+                    pilot_paths=config["pilot_paths"],
+                    ruin_tolerance=config["ruin_tolerance"],
+                    max_seconds=config["max_seconds"],
+                    n_workers=config["n_workers"],
+                    return_source=return_source,
+                    dtype=config["dtype"],
+                    cache=cache,
+                    **sim_kwargs,
+                )
+                checks.append(
+                    {
+                        "retire_age": row["retire_age"],
+                        "best_monthly_spending": row["best_monthly_spending"],
+                        "ruin_probability": res["ruin_probability"],
+                        "ruin_probability_stderr": res["ruin_probability_stderr"],
+                        "effective_sample_size": res["effective_sample_size"],
+                        "n_paths": res["n_paths"],
+                        "stop_reason": res["stop_reason"],
+                    }
+                )
+            print()
+            print("Ruin probability of each chosen policy on fresh paths:")
+            ruin_format = {"ruin_probability": "{:.4f}".format, "ruin_probability_stderr": "{:.4f}".format}
+            print(pd.DataFrame(checks).to_string(index=False, formatters=ruin_format))
+
+        chosen = [row for row in rows if pd.notnull(row["best_monthly_spending"])]
+        # with sigma=0 the Monte Carlo model must reduce to the deterministic one
+        limit = validate_deterministic_limit(
+            retire_ages=[row["retire_age"] for row in chosen],
+            monthly_spendings=[row["best_monthly_spending"] for row in chosen],
+            mu=config["mu"],
+            **sim_kwargs,
+        )
+        if not limit["agrees"].all():
+            print()
+            print("Monte Carlo and deterministic results differ at sigma=0 for these ages:")
+            print(limit[~limit["agrees"]].to_string(index=False))
+
+        if config["dtype"] == "float32":
+            # float32 is only trusted where it reproduces the float64 ruin probabilities
+            validation = validate_float32(
+                retire_ages=[row["retire_age"] for row in chosen],
+                monthly_spendings=[row["best_monthly_spending"] for row in chosen],
+                sigma=config["sigma"],
+                n_paths=config["n_paths"],
+                seed=config["seed"],
+                mu=config["mu"],
+                memory_budget_mb=config["memory_budget_mb"],
+                return_source=return_source,
+                **sim_kwargs,
+            )
+            if not validation["safe"].all():
+                print()
+                print("float32 changes the ruin probability beyond tolerance for these ages:")
+                print(validation[~validation["safe"]].to_string(index=False))
+
+        if return_source is not None:
+            # the ruin-constrained spending of every age, run from every historical start month
+            backtest = backtest_ages(
+                ages=ages,
+                monthly_spendings=np.array([row["best_monthly_spending"] for row in rows], dtype=float),
+                return_source=return_source,
+                quantiles=(0.5,),
+                cache=cache,
+                **sim_kwargs,
+            )
+            print()
+            print(backtest.to_string(index=False))
@@ -0,0 +1,91 @@
+"""
+Shared-memory NumPy arrays for worker processes.
+
+A SharedArray places an array in a multiprocessing.shared_memory block so worker
+processes can map it without copying: the owner passes the small, picklable `spec` to
+the workers, which open it with SharedArray.attach. Used by the Monte Carlo engine to
+share a chunk of return paths and the policy schedules between the processes of a pool
+instead of pickling them into every task.
+
+- SharedArraySpec -> (name, shape, dtype) of a segment; all a worker needs to attach.
+- SharedArray -> owner / attached view of a segment, usable as a context manager.
+"""
+
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+from typing import NamedTuple, Tuple
+
+
+class SharedArraySpec(NamedTuple):
+    """Picklable description of a SharedArray: segment name, shape and dtype string."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _release(shm: shared_memory.SharedMemory, unlink: bool) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # views of the array are still alive; the mapping goes away with them
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedArray:
+    """
+    NumPy array (`array`) backed by a multiprocessing.shared_memory segment.
+
+    The creating process owns the segment and unlinks it when the SharedArray is closed:
+    explicitly, on leaving its `with` block (also on exceptions), when it is garbage
+    collected or at interpreter exit (weakref.finalize). If the owner is killed, the
+    multiprocessing resource tracker unlinks the segment. Attached instances only close
+    their own mapping.
+
+    Workers of a multiprocessing / concurrent.futures pool share the owner's resource
+    tracker, so attaching from them does not lead to early unlinking.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.float64):
+        dtype = np.dtype(dtype)
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self._open(shared_memory.SharedMemory(create=True, size=size), shape, dtype, owner=True)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "SharedArray":
+        """New owned segment holding a copy of `array`."""
+        array = np.asarray(array)
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, spec: SharedArraySpec) -> "SharedArray":
+        """Map an existing segment (created by another process) without copying."""
+        shared = cls.__new__(cls)
+        shared._open(shared_memory.SharedMemory(name=spec.name), spec.shape, np.dtype(spec.dtype), owner=False)
+        return shared
+
+    def _open(self, shm: shared_memory.SharedMemory, shape: Tuple[int, ...], dtype: np.dtype, owner: bool) -> None:
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.spec = SharedArraySpec(shm.name, shape, dtype.str)
+        self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+    def close(self) -> None:
+        """Drop the mapping (and unlink the segment if this process owns it)."""
+        self.array = None
+        self._finalizer()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()